@@ -2,78 +2,31 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import streamlit as st
-
-
-current_month = st.session_state.selected_month
-current_year = st.session_state.selected_year
-
-def preprocess_kpi(profit_loss_df, balance_sheet_df):
-    df = st.session_state.data
-    kpi_list = []
-    # Calculate KPIs
-    sales = profit_loss_df[['Year-Month', 'Sales Revenue']]
-    cogs = profit_loss_df[['Year-Month', 'Cost of Goods Sold']]
-    margin = profit_loss_df[['Year-Month', 'Gross Margin']]
-    ebitda = profit_loss_df[['Year-Month', 'EBITDA']]
-    net_result = profit_loss_df[['Year-Month', 'Net Result']]
-    #dso = calculate_dso(group, sales)
-    #dio = calculate_dio(group, cogs)
-    #dpo = calculate_dpo(group, cogs)
-    #ccc = calculate_ccc(dio, dso, dpo)
-    cash = balance_sheet_df[['Year-Month', 'cash and cash equivalents']]
-    shareholders_equity = balance_sheet_df[['Year-Month', 'total equity']]
-    total_assets = balance_sheet_df[['Year-Month', 'total assets']]
-    total_debt = balance_sheet_df[['Year-Month', 'total liabilities']]
-    #roe = balance_sheet_df[['Year-Month', 'cash and cash equivalents']]
-    #roa = balance_sheet_df[['Year-Month', 'cash and cash equivalents']]
-    #debt_to_equity = total_debt / shareholders_equity if shareholders_equity != 0 else 0
-    accounts_payable = balance_sheet_df[['Year-Month', 'accounts payable']]
-    current_liabilities = balance_sheet_df[['Year-Month', 'total liabilities']]
-    accounts_receivable = balance_sheet_df[['Year-Month', 'accounts receivable']]
-    #quick_ratio = calculate_quick_ratio(cash, accounts_receivable, current_liabilities)
-        
-                
-    # Append to KPI list
-    kpi_list.append({
-        #'Month': group['Month'].iloc[0],
-        #'Year': group['Year'].iloc[0],
-        #'Year-Month': name,
-        'Sales Revenue': sales,
-        'Margin (%)': margin,
-        'EBITDA': ebitda,
-        'Net Result': net_result,
-        'Cash Position': cash,
-        'Available Credit Line': total_assets,
-        #'Overdraft Availability': overdraft_availability,
-        'Debt to Equity Ratio': total_debt,
-        #'Quick Ratio': quick_ratio
-    })
+from chart_of_accounts import line_code, line_codes, get_line_codes
+
+
+def preprocess_kpi(profit_loss_df, balance_sheet_df, df=None):
+    if df is None:
+        # Only the dashboard calls this without a ledger; batch runs never import streamlit
+        import streamlit as st
+        df = st.session_state.data
+    kpi_df = kpi_table(profit_loss_df, balance_sheet_df)
+
+    # Revenue (Credit - Debit) of the sales rows, rolled up per month in one multi-key groupby each
+    sales_revenue = rows_for(df, 'sales revenue')
 
-    # Create KPI DataFrame
-    kpi_df = pd.DataFrame(kpi_list)
-    #st.write(kpi_df)
+    def revenue_by(dimension):
+        totals = sales_revenue.groupby(['Year-Month', dimension], observed=True)[['Credit', 'Debit']].sum()
+        revenue = (totals['Credit'] - totals['Debit']).rename('Revenue').reset_index()
+        return revenue[[dimension, 'Revenue', 'Year-Month']]
 
     # Calculate Revenue per Product per Month
-    revenue_per_product_list = []
-    grouped = df.groupby('Year-Month')
-    for name, group in grouped:
-        sales_revenue = group[group['Account'] == 'sales revenue']
-        revenue_product = sales_revenue.groupby('Component')['Credit'].sum() - sales_revenue.groupby('Component')['Debit'].sum()
-        revenue_product = revenue_product.reset_index().rename(columns={0: 'Revenue'})
-        revenue_product['Year-Month'] = name
-        revenue_per_product_list.append(revenue_product)
-    revenue_per_product_df = pd.concat(revenue_per_product_list, ignore_index=True)
-
-    # Calculate Top Clients by Revenue per Month
-    top_clients_list = []
-    for name, group in grouped:
-        sales_revenue = group[group['Account'] == 'sales revenue']
-        clients_revenue = sales_revenue.groupby('Supplier/client')['Credit'].sum() - sales_revenue.groupby('Supplier/client')['Debit'].sum()
-        top_clients = clients_revenue.sort_values(ascending=False).head(5).reset_index().rename(columns={0: 'Revenue'})
-        top_clients['Year-Month'] = name
-        top_clients_list.append(top_clients)
-    top_clients_by_revenue_df = pd.concat(top_clients_list, ignore_index=True)
+    revenue_per_product_df = revenue_by('Component')
+
+    # Calculate Top Clients by Revenue per Month: sort once, then keep the first 5 rows of each month
+    clients_revenue = revenue_by('Supplier/client')
+    clients_revenue = clients_revenue.sort_values(['Year-Month', 'Revenue'], ascending=[True, False], kind='stable')
+    top_clients_by_revenue_df = clients_revenue.groupby('Year-Month', observed=True).head(5).reset_index(drop=True)
 
     # Save the dataframes to csv
     #revenue_per_product_df.to_csv(f'{output_folder}/revenue_per_product.csv', index=False)
@@ -85,14 +38,80 @@ def preprocess_kpi(profit_loss_df, balance_sheet_df):
     #print(f"KPI: {kpi_df.head()}")
     return kpi_df, revenue_per_product_df, top_clients_by_revenue_df
 
+# KPI columns of kpi_df, all float64
+KPI_COLUMNS = ['Sales Revenue', 'Gross Margin', 'Margin (%)', 'EBITDA', 'Net Result', 'Cash Position',
+               'Total Assets', 'Total Liabilities', 'Total Equity', 'Debt to Equity Ratio', 'Quick Ratio',
+               'DSO', 'DIO', 'DPO', 'CCC']
+
+
+def kpi_table(profit_loss_df, balance_sheet_df):
+    # One row per balance sheet month, indexed by the integer period key, one float column per KPI.
+    # Year-Month / Year / Month columns are kept for display and filtering.
+    flows = profit_loss_df.set_index(profit_loss_df['Year-Month'].astype(str))
+    balances = balance_sheet_df.set_index(balance_sheet_df['Year-Month'].astype(str))
+    flows = flows.reindex(balances.index)
+    working_capital = working_capital_kpis(profit_loss_df, balance_sheet_df).set_index('Year-Month')
+
+    kpi_df = pd.DataFrame({
+        'Sales Revenue': flows['Sales Revenue'],
+        'Gross Margin': flows['Gross Margin'],
+        'Margin (%)': flows['Gross Margin (%)'],
+        'EBITDA': flows['EBITDA'],
+        'Net Result': flows['Net Result'],
+        'Cash Position': balances['cash and cash equivalents'],
+        'Total Assets': balances['total assets'],
+        'Total Liabilities': balances['total liabilities'],
+        'Total Equity': balances['total equity'],
+        'Debt to Equity Ratio': safe_divide(balances['total liabilities'], balances['total equity']),
+    }, index=balances.index).fillna(0).astype('float64')
+    kpi_df = kpi_df.join(working_capital[['Quick Ratio', 'DSO', 'DIO', 'DPO', 'CCC']])[KPI_COLUMNS]
+
+    parts = kpi_df.index.str.split('-', expand=True)
+    years = np.asarray(parts.get_level_values(0), dtype='int64')
+    months = np.asarray(parts.get_level_values(1), dtype='int64')
+    kpi_df = kpi_df.rename_axis('Year-Month').reset_index()
+    kpi_df.insert(1, 'Year', years.astype('int16'))
+    kpi_df.insert(2, 'Month', months.astype('int16'))
+    kpi_df.index = pd.Index(years * 12 + months - 1, name='Period')
+    return kpi_df
+
+
+def compare_periods(kpi_df, year, month, periods=1):
+    # KPIs of one month next to those `periods` months earlier, with the absolute and relative change
+    period = year * 12 + month - 1
+    current = kpi_df[KPI_COLUMNS].reindex([period]).iloc[0]
+    previous = kpi_df[KPI_COLUMNS].reindex([period - periods]).iloc[0]
+    change = current - previous
+    return pd.DataFrame({
+        'Current': current,
+        'Previous': previous,
+        'Change': change,
+        'Change (%)': safe_divide(change, previous.abs()) * 100,
+    })
+
+
+def save_kpis(kpi_df, path):
+    kpi_df.to_parquet(path)
+
+
+def load_kpis(path):
+    return pd.read_parquet(path)
+
+
 # Define the KPI calculation functions here (unchanged from the original script)
+def rows_for(group, accounts):
+    # Ledger rows posted to the given account(s), matched on the chart-of-accounts line code
+    if isinstance(accounts, str):
+        return group[get_line_codes(group) == line_code(accounts)]
+    return group[get_line_codes(group).isin(line_codes(accounts))]
+
 def calculate_sales_revenue(group):
-    sales_revenue = group[group['Account'] == 'sales revenue']
+    sales_revenue = rows_for(group, 'sales revenue')
     total_sales = -sales_revenue['Solde'].sum()
     return total_sales
 
 def calculate_cogs(group):
-    cogs = group[group['Account'] == 'cost of goods sold']['Debit'].sum()
+    cogs = rows_for(group, 'cost of goods sold')['Debit'].sum()
     return cogs
 
 def calculate_margin(sales, cogs):
@@ -102,30 +121,33 @@ def calculate_margin(sales, cogs):
         return 0
 
 def calculate_ebitda(group, revenue_accounts, expense_accounts):
-    total_revenue = group[group['Account'].isin(revenue_accounts)]['Solde'].sum()
-    total_operating_expenses = group[group['Account'].isin(expense_accounts)]['Solde'].sum()
+    total_revenue = rows_for(group, revenue_accounts)['Solde'].sum()
+    total_operating_expenses = rows_for(group, expense_accounts)['Solde'].sum()
     ebitda = total_revenue - total_operating_expenses
     return ebitda
 
 def calculate_net_result(group, expense_accounts_full):
-    total_revenue = group[group['Account'] == 'sales revenue']['Solde'].sum() 
-    total_expenses = group[group['Account'].isin(expense_accounts_full)]['Solde'].sum() 
+    total_revenue = rows_for(group, 'sales revenue')['Solde'].sum()
+    total_expenses = rows_for(group, expense_accounts_full)['Solde'].sum()
     net_result = total_revenue - total_expenses
     return net_result
 
 def calculate_dso(group, sales):
-    accounts_receivable = group[group['Account'] == 'accounts receivable']['Credit'].sum() - group[group['Account'] == 'accounts receivable']['Debit'].sum()
+    receivables = rows_for(group, 'accounts receivable')
+    accounts_receivable = receivables['Credit'].sum() - receivables['Debit'].sum()
     dso = (accounts_receivable / sales) * 30 if sales != 0 else 0
     return dso
 
 def calculate_dio(group, cogs):
     inventory_accounts = ['Raw material inventory', 'Inventory']
-    inventory = group[group['Account'].isin(inventory_accounts)]['Debit'].sum() - group[group['Account'].isin(inventory_accounts)]['Credit'].sum()
+    inventories = rows_for(group, inventory_accounts)
+    inventory = inventories['Debit'].sum() - inventories['Credit'].sum()
     dio = (inventory / cogs) * 30 if cogs != 0 else 0
     return dio
 
 def calculate_dpo(group, cogs):
-    accounts_payable = group[group['Account'] == 'accounts payable']['Debit'].sum() - group[group['Account'] == 'accounts payable']['Credit'].sum()
+    payables = rows_for(group, 'accounts payable')
+    accounts_payable = payables['Debit'].sum() - payables['Credit'].sum()
     dpo = (accounts_payable / cogs) * 30 if cogs != 0 else 0
     return dpo
 
@@ -133,24 +155,30 @@ def calculate_ccc(dio, dso, dpo):
     return dio + dso - dpo
 
 def calculate_cash_position(group):
-    cash = group[group['Account'] == 'cash and cash equivalents']['Credit'].sum() - group[group['Account'] == 'cash and cash equivalents']['Debit'].sum()
+    cash_rows = rows_for(group, 'cash and cash equivalents')
+    cash = cash_rows['Credit'].sum() - cash_rows['Debit'].sum()
     return cash
 
 def calculate_shareholders_equity(group):
-    share_capital = group[group['Account'] == 'share capital']['Credit'].sum() - group[group['Account'] == 'share capital']['Debit'].sum()
-    retained_earnings = group[group['Account'] == 'retained earnings']['Credit'].sum() - group[group['Account'] == 'retained earnings']['Debit'].sum()
+    capital = rows_for(group, 'share capital')
+    retained = rows_for(group, 'retained earnings')
+    share_capital = capital['Credit'].sum() - capital['Debit'].sum()
+    retained_earnings = retained['Credit'].sum() - retained['Debit'].sum()
     shareholders_equity = share_capital + retained_earnings
     return shareholders_equity
 
 def calculate_total_assets(group):
     asset_accounts = ['cash and cash equivalents', 'accounts receivable', 'raw material inventory', 
                       'inventory', 'property, plant, and equipment (ppe)', 'intangible assets']
-    total_assets = group[group['Account'].isin(asset_accounts)]['Credit'].sum() - group[group['Account'].isin(asset_accounts)]['Debit'].sum()
+    assets = rows_for(group, asset_accounts)
+    total_assets = assets['Credit'].sum() - assets['Debit'].sum()
     return total_assets
 
 def calculate_total_debt(group):
-    short_term_debt = group[group['Account'] == 'short-term debt']['Debit'].sum() - group[group['Account'] == 'short-term debt']['Credit'].sum()
-    long_term_debt = group[group['Account'] == 'long-term debt']['Debit'].sum() - group[group['Account'] == 'long-term debt']['Credit'].sum()
+    short_term = rows_for(group, 'short-term debt')
+    long_term = rows_for(group, 'long-term debt')
+    short_term_debt = short_term['Debit'].sum() - short_term['Credit'].sum()
+    long_term_debt = long_term['Debit'].sum() - long_term['Credit'].sum()
     total_debt = short_term_debt + long_term_debt
     return total_debt
 
@@ -160,5 +188,40 @@ def calculate_quick_ratio(cash, accounts_receivable, current_liabilities):
     else:
         return 0
 
+# Days per month used to turn monthly balances / flows into days, as in calculate_dso and friends
+DAYS_PER_MONTH = 30
+
+
+def safe_divide(numerator, denominator):
+    # Element-wise numerator / denominator, 0 where the denominator is 0 (like the scalar helpers above)
+    numerator = np.asarray(numerator, dtype='float64')
+    denominator = np.asarray(denominator, dtype='float64')
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+
+def working_capital_kpis(profit_loss_df, balance_sheet_df, days=DAYS_PER_MONTH):
+    # DSO / DIO / DPO / CCC / quick ratio of every month at once, from month-end balances and the month's P&L
+    flows = profit_loss_df.set_index('Year-Month')[['Sales Revenue', 'Cost of Goods Sold']]
+    balances = balance_sheet_df.set_index('Year-Month')
+    flows = flows.reindex(balances.index).fillna(0)
+    receivables = balances['accounts receivable'].to_numpy()
+    inventory = balances['raw material inventory'].to_numpy()
+    payables = balances['accounts payable'].to_numpy()
+
+    dso = safe_divide(receivables, flows['Sales Revenue']) * days
+    dio = safe_divide(inventory, flows['Cost of Goods Sold']) * days
+    dpo = safe_divide(payables, flows['Cost of Goods Sold']) * days
+    return pd.DataFrame({
+        'Year-Month': balances.index.astype(str),
+        'DSO': dso,
+        'DIO': dio,
+        'DPO': dpo,
+        'CCC': dio + dso - dpo,
+        'Quick Ratio': safe_divide(balances['cash and cash equivalents'] + balances['accounts receivable'],
+                                   balances['total liabilities']),
+        'Net Working Capital': receivables + inventory - payables,
+    })
+
+
 if __name__ == "__main__":
     preprocess_kpi('data/journalEntry.csv', 'data')
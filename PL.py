@@ -1,74 +1,45 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
+from chart_of_accounts import line_code, get_line_codes
 
 
+PL_LINES = ['sales revenue', 'cost of goods sold', 'personnel', 'facility', 'administration',
+            'financial income', 'financial cost']
 
-def preprocess_pl(df):
-    # Step 3: Define KPI Calculation Functions
-    def calculate_sales_revenue(df):
-        sales = df[df['Account'] == 'sales revenue'].groupby('Year-Month')['Solde'].sum().reset_index()
-        sales['Sales Revenue'] = -sales['Solde']
-        return sales[['Year-Month', 'Sales Revenue']]
-
-    def calculate_cogs(df):
-        cogs = df[df['Account'] == 'cost of goods sold'].groupby('Year-Month')['Solde'].sum().reset_index()
-        cogs.rename(columns={'Solde': 'Cost of Goods Sold'}, inplace=True)
-        return cogs[['Year-Month', 'Cost of Goods Sold']]
-
-    def calculate_gross_margin(sales, cogs):
-        gm = pd.merge(sales, cogs, on='Year-Month', how='outer')
-        gm['Gross Margin'] = gm['Sales Revenue'] - gm['Cost of Goods Sold']
-        gm['Gross Margin (%)'] = (gm['Gross Margin'] / gm['Sales Revenue']) * 100
-        return gm
-
-    def calculate_operating_expenses(df):
-        personnel = df[df['Account'] == 'personnel'].groupby('Year-Month')['Solde'].sum().reset_index()
-        personnel.rename(columns={'Solde': 'Personnel'}, inplace=True)
-        
-        facility = df[df['Account'] == 'facility'].groupby('Year-Month')['Solde'].sum().reset_index()
-        facility.rename(columns={'Solde': 'Facility'}, inplace=True)
-        
-        administration = df[df['Account'] == 'administration'].groupby('Year-Month')['Solde'].sum().reset_index()
-        administration.rename(columns={'Solde': 'Administration'}, inplace=True)
-        
-        operating_exp = pd.merge(personnel, facility, on='Year-Month', how='outer')
-        operating_exp = pd.merge(operating_exp, administration, on='Year-Month', how='outer').fillna(0)
-        
-        return operating_exp
-
-    def calculate_ebitda(gross_margin, operating_expenses):
-        ebitda = pd.merge(gross_margin, operating_expenses, on='Year-Month', how='outer')
-        ebitda['EBITDA'] = ebitda['Gross Margin'] - (ebitda['Personnel'] + ebitda['Facility'] + ebitda['Administration'])
-        return ebitda
 
-    def calculate_financials(df):
-        fin_income = df[df['Account'].str.lower() == 'financial income'].groupby('Year-Month')['Solde'].sum().reset_index()
-        fin_income['Solde'] = -fin_income['Solde']
-        fin_income.rename(columns={'Solde': 'Financial Income'}, inplace=True)
-        
-        fin_cost = df[df['Account'].str.lower() == 'financial cost'].groupby('Year-Month')['Solde'].sum().reset_index()
-        fin_cost.rename(columns={'Solde': 'Financial Cost'}, inplace=True)
-        
-        financials = pd.merge(fin_income, fin_cost, on='Year-Month', how='outer').fillna(0)
-        return financials
-
-    def calculate_net_result(ebitda, financials):
-        net = pd.merge(ebitda, financials, on='Year-Month', how='outer')
-        net['Net Result'] = net['EBITDA'] + net['Financial Income'] - net['Financial Cost']
-        return net
-
-    # Step 4: Calculate Each KPI
-    sales_revenue = calculate_sales_revenue(df)
-    cogs = calculate_cogs(df)
-    gross_margin = calculate_gross_margin(sales_revenue, cogs)
-    operating_expenses = calculate_operating_expenses(df)
-    ebitda = calculate_ebitda(gross_margin, operating_expenses)
-    financials = calculate_financials(df)
-    net_result = calculate_net_result(ebitda, financials)
-
-    # Step 5: Consolidate KPIs
-    profit_loss = net_result
+def preprocess_pl(df):
+    # Step 1: Group the ledger once on (Year-Month, line-item code)
+    lines = df.groupby(['Year-Month', get_line_codes(df)], observed=True)['Solde'].sum().unstack()
+    lines = lines.reindex(columns=[line_code(account) for account in PL_LINES])
+    lines.columns = PL_LINES
+    lines.columns.name = None
+    lines = lines.dropna(how='all')
+
+    def fill_posted(block):
+        # Lines of a block are zero-filled only for the months where at least one of them was posted
+        return block.fillna(0).where(block.notna().any(axis=1), axis=0)
+
+    # Step 2: Calculate Each KPI
+    profit_loss = pd.DataFrame(index=lines.index)
+    profit_loss['Sales Revenue'] = -lines['sales revenue']
+    profit_loss['Cost of Goods Sold'] = lines['cost of goods sold']
+    profit_loss['Gross Margin'] = profit_loss['Sales Revenue'] - profit_loss['Cost of Goods Sold']
+    profit_loss['Gross Margin (%)'] = (profit_loss['Gross Margin'] / profit_loss['Sales Revenue']) * 100
+
+    operating_expenses = fill_posted(lines[['personnel', 'facility', 'administration']])
+    profit_loss['Personnel'] = operating_expenses['personnel']
+    profit_loss['Facility'] = operating_expenses['facility']
+    profit_loss['Administration'] = operating_expenses['administration']
+    profit_loss['EBITDA'] = profit_loss['Gross Margin'] - (profit_loss['Personnel'] + profit_loss['Facility'] + profit_loss['Administration'])
+
+    financials = fill_posted(lines[['financial income', 'financial cost']])
+    profit_loss['Financial Income'] = -financials['financial income']
+    profit_loss['Financial Cost'] = financials['financial cost']
+    profit_loss['Net Result'] = profit_loss['EBITDA'] + profit_loss['Financial Income'] - profit_loss['Financial Cost']
+
+    # Step 3: Consolidate KPIs
+    profit_loss = profit_loss.rename_axis('Year-Month').reset_index()
 
     # Add Month and Year columns
     profit_loss['Month'] = profit_loss['Year-Month'].str.split('-').str[1].astype(int)
@@ -79,10 +50,6 @@ def preprocess_pl(df):
                          'Personnel', 'Facility', 'Administration', 'EBITDA',
                          'Financial Income', 'Financial Cost', 'Net Result']
     profit_loss[financial_columns] = profit_loss[financial_columns].fillna(0)
-    #devide by 1000
-    profit_loss[financial_columns] = profit_loss[financial_columns]
-    
-    #st.session_state.profit_loss = profit_loss
 
     return profit_loss
 
@@ -1,10 +1,5 @@
 import streamlit as st
-import pandas as pd
 import os
-from KPI import preprocess_kpi
-from PL import preprocess_pl
-from BS import preprocess_bs
-from dashboardExecutiveSummary import display_es, display_pl, display_revenue, display_bs
 #st.set_page_config(page_title="Financial Dashboard AIFINA v2", page_icon="💰")
 
 #st.set_page_config(page_title="Financial Dashboard", layout="wide")
@@ -23,11 +18,21 @@ from dashboardExecutiveSummary import display_es, display_pl, display_revenue, d
 
 # Check if data is available before processing
 if st.session_state.data is not None:
+    # Statement and chart modules are only needed once a ledger is loaded
+    from statements import profit_and_loss, balance_sheet, kpis
+    from precompute import wait_for_statements
+    from dashboardExecutiveSummary import display_es, display_pl, display_revenue, display_bs
+
     with st.spinner("Processing data..."):
+        # Statements are memoised on the ledger's content hash, so reruns that only
+        # change the selected month are cache hits
         df = st.session_state.data
-        profit_loss_df = preprocess_pl(df)
-        balance_sheet_df = preprocess_bs(df, profit_loss_df)
-        kpi_df, revenue_per_product_df, top_clients_by_revenue_df = preprocess_kpi(profit_loss_df, balance_sheet_df)
+        ledger_key = st.session_state.get('ledger_key')
+        # Started by main.py on upload; shows progress while background jobs are still running
+        wait_for_statements(ledger_key, ['profit_loss', 'balance_sheet', 'kpi'])
+        profit_loss_df = profit_and_loss(df, key=ledger_key)
+        balance_sheet_df = balance_sheet(df, key=ledger_key)
+        kpi_df, revenue_per_product_df, top_clients_by_revenue_df = kpis(df, key=ledger_key)
 
     # Use a unique key for the selectbox
     page = st.sidebar.selectbox("Choose a page", ["Profit & Loss", "Balance Sheet"], key="page_selection")
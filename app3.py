@@ -4,6 +4,10 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+from chart_of_accounts import normalize_account
+from ledger_cache import cached_ledger, content_hash
+from timeseries import FREQUENCIES, account_series
+from explorer import transaction_explorer
 
 # Set page config (must be the first Streamlit command)
 #st.set_page_config(page_title="CFO Financial Dashboard", layout="wide")
@@ -11,25 +15,16 @@ from datetime import datetime
 # Load data
 @st.cache_data
 def load_data():
-    journal_entry_df = pd.read_csv('data/journalEntry.csv')
+    with open('data/journalEntry.csv', 'rb') as f:
+        data = f.read()
+    # The content hash keys the derived series, so they are not rebuilt on every rerun
+    ledger_key = content_hash(data)
+    journal_entry_df = cached_ledger(data, key=ledger_key)
     budget_df = pd.read_csv('data/budget.csv')
     
-    # Rename columns for consistency
-    journal_entry_df.columns = [
-        'Date', 'Month', 'Year', 'Journal Entry ID', 'Account',
-        'Debit', 'Credit', 'Solde', 'Description',
-        'Document Reference', 'Currency', 'Supplier/client', 'Component'
-    ]
-    
-    # Convert 'Date' to datetime
-    journal_entry_df['Date'] = pd.to_datetime(journal_entry_df['Date'])
-    
-    # Ensure 'Solde' is of type float
-    journal_entry_df['Solde'] = journal_entry_df['Solde'].astype(float)
-    
-    return journal_entry_df, budget_df
+    return journal_entry_df, budget_df, ledger_key
 
-journal_entry_df, budget_df = load_data()
+journal_entry_df, budget_df, ledger_key = load_data()
 
 # Sidebar for input parameters
 st.sidebar.header("Dashboard Parameters")
@@ -42,14 +37,19 @@ current_year = st.sidebar.slider("Current Year", journal_entry_df['Year'].min(),
 
 # Calculate dashboard metrics
 def calculate_dashboard_metrics(journal_df, budget_df, sales_account, cogs_account, opex_accounts, current_month, current_year):
+    # Ledger accounts are normalised at ingest; match the selected names the same way
+    ledger_sales_account = normalize_account(sales_account)
+    ledger_cogs_account = normalize_account(cogs_account)
+    ledger_opex_accounts = [normalize_account(account) for account in opex_accounts]
+
     # Filter data for the selected month and year
     filtered_sales = journal_df[
-        (journal_df['Account'] == sales_account) &
+        (journal_df['Account'] == ledger_sales_account) &
         (journal_df['Month'] == current_month) &
         (journal_df['Year'] == current_year)
     ]
     filtered_cogs = journal_df[
-        (journal_df['Account'] == cogs_account) &
+        (journal_df['Account'] == ledger_cogs_account) &
         (journal_df['Month'] == current_month) &
         (journal_df['Year'] == current_year)
     ]
@@ -71,7 +71,7 @@ def calculate_dashboard_metrics(journal_df, budget_df, sales_account, cogs_accou
     prev_month = 12 if current_month == 1 else current_month - 1
     prev_year = current_year - 1 if current_month == 1 else current_year
     filtered_prev_sales = journal_df[
-        (journal_df['Account'] == sales_account) &
+        (journal_df['Account'] == ledger_sales_account) &
         (journal_df['Month'] == prev_month) &
         (journal_df['Year'] == prev_year)
     ]
@@ -86,7 +86,7 @@ def calculate_dashboard_metrics(journal_df, budget_df, sales_account, cogs_accou
     
     # EBITDA calculations
     filtered_opex = journal_df[
-        journal_df['Account'].isin(opex_accounts) &
+        journal_df['Account'].isin(ledger_opex_accounts) &
         (journal_df['Month'] == current_month) &
         (journal_df['Year'] == current_year)
     ]
@@ -154,11 +154,12 @@ col4.metric(
 st.markdown("<h3 style='text-align: center; color: white;'>Additional Metrics</h3>", unsafe_allow_html=True)
 
 # Revenue and Expenses Over Time
-revenue_expenses_df = journal_entry_df[
-    journal_entry_df['Account'].isin([sales_account, cogs_account] + opex_accounts)
-]
-revenue_expenses_df = revenue_expenses_df.groupby(['Date', 'Account'])['Solde'].sum().reset_index()
-revenue_expenses_df['Solde'] = revenue_expenses_df['Solde'].abs()
+# Aggregated server-side to a bounded number of points per account (see timeseries.py)
+granularity = st.sidebar.selectbox("Chart granularity", ['Auto'] + list(FREQUENCIES))
+revenue_expenses_df, granularity = account_series(
+    journal_entry_df, [normalize_account(account) for account in [sales_account, cogs_account] + opex_accounts],
+    granularity, key=ledger_key
+)
 
 # Plotting with dark theme
 fig_revenue_expenses = px.line(
@@ -166,11 +167,11 @@ fig_revenue_expenses = px.line(
     x='Date',
     y='Solde',
     color='Account',
-    title='Revenue and Expenses Over Time',
+    title=f'Revenue and Expenses Over Time (by {granularity.lower()})',
     template='plotly_dark'
 )
 st.plotly_chart(fig_revenue_expenses, use_container_width=True)
 
 # Display the filtered data table
 st.markdown("<h2 style='text-align: center; color: white;'>Transaction Data</h2>", unsafe_allow_html=True)
-st.dataframe(journal_entry_df)
+transaction_explorer(journal_entry_df, "app3_transactions", ledger_key=ledger_key, year=current_year, month=current_month)
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from calculations import financial_dashboard
+from statements import working_capital
 
 
 
@@ -12,17 +13,21 @@ if 'data' not in st.session_state or st.session_state.data is None:
 
 # Use the data and filters from session state
 df = st.session_state.data
-current_month = st.session_state.selected_month
-current_year = st.session_state.selected_year
+# The month picked on the main page, November 2022 until one is picked
+current_month = st.session_state.get('selected_month') or 11
+current_year = st.session_state.get('selected_year') or 2022
 
 # Get financial data
 sales_account = 'Sales Revenue'
 cogs_account = 'Cost of goods sold'
 opex_accounts = ['Personnel', 'Facility', 'Administration']
-current_month = 11  # November
-current_year = 2022
 
-dashboard_data = financial_dashboard(df, sales_account, cogs_account, opex_accounts, current_month, current_year)
+dashboard_data = financial_dashboard(df, sales_account, cogs_account, opex_accounts, current_month, current_year,
+                                     key=st.session_state.get('ledger_key'))
+
+# Working-capital ratios of every month, computed at once; the card shows the selected month
+working_capital_df = working_capital(df, key=st.session_state.get('ledger_key')).set_index('Year-Month')
+wc = working_capital_df.reindex([f"{current_year}-{current_month:02d}"]).fillna(0).iloc[0]
 
 # Create three columns for metrics
 col1, col2, col3 = st.columns(3)
@@ -30,7 +35,7 @@ col1, col2, col3 = st.columns(3)
 metrics = [
     ("Margin", f"{dashboard_data['Margin (%)']}%", "24.85%", "26%", "26%"),
     ("EBITDA", "99.69 K$", "115.14 K$", "338.85 K$", "5,435.77 K$"),
-    ("Working Capital", "-14", "DSO: 74", "DIO: 22", "DPO: 110")
+    ("Working Capital", f"{wc['CCC']:.0f}", f"DSO: {wc['DSO']:.0f}", f"DIO: {wc['DIO']:.0f}", f"DPO: {wc['DPO']:.0f}")
 ]
 
 for i, (label, value, budget, prev, ytd) in enumerate(metrics):
@@ -70,7 +75,8 @@ def create_chart(data, x, y, title, chart_type='scatter'):
 charts = [
     create_chart(charts_data, 'Month', 'Margin (%)', 'Margin'),
     create_chart(charts_data, 'Month', 'EBITDA', 'EBITDA', 'bar'),
-    create_chart(charts_data, 'Month', 'Sales Revenue', 'Working Capital')
+    create_chart(working_capital_df[working_capital_df.index.str.startswith(str(current_year))].reset_index(),
+                 'Year-Month', 'CCC', 'Working Capital')
 ]
 
 for i, chart in enumerate(charts):
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import st_tailwind as tw
+from statements import working_capital
 
 # Set page config
 #st.set_page_config(page_title="AIFINA Financial Dashboard", layout="wide")
@@ -64,11 +65,24 @@ st.markdown("""
 months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov']
 margin_data = [24, 23, 25, 26, 26, 26, 26, 25, 26, 26, 24]
 ebitda_data = [100, 90, 110, 120, 115, 130, 125, 110, 120, 125, 95]
-working_capital_data = {
-    'dso': [74] * 11,
-    'dio': [22] * 11,
-    'dpo': [110] * 11
-}
+
+# Working-capital ratios of the uploaded ledger, all months computed at once; the chart covers the selected year
+if st.session_state.get('data') is not None:
+    year = st.session_state.get('selected_year') or 2022
+    month = st.session_state.get('selected_month') or 11
+    wc_df = working_capital(st.session_state.data, key=st.session_state.get('ledger_key'))
+    wc_year = wc_df[wc_df['Year-Month'].str.startswith(f"{year}-")]
+    working_capital_data = {
+        'months': wc_year['Year-Month'].tolist(),
+        'dso': wc_year['DSO'].round(0).tolist(),
+        'dio': wc_year['DIO'].round(0).tolist(),
+        'dpo': wc_year['DPO'].round(0).tolist()
+    }
+    wc = wc_df.set_index('Year-Month').reindex([f"{year}-{month:02d}"]).fillna(0).iloc[0]
+    wc_values = {name: f"{wc[name]:.0f}" for name in ['CCC', 'DSO', 'DIO', 'DPO']}
+else:
+    working_capital_data = {'months': [], 'dso': [], 'dio': [], 'dpo': []}
+    wc_values = {name: "n/a" for name in ['CCC', 'DSO', 'DIO', 'DPO']}
 
 # Common chart layout
 base_layout = dict(
@@ -166,30 +180,30 @@ with col2:
 
 # Working Capital Section
 with col3:
-    st.markdown("""
+    st.markdown(f"""
         <div class="metric-card">
             <div class="metric-title">Working Capital</div>
-            <div class="metric-value">-14</div>
-            <div class="metric-detail">DSO: 74</div>
-            <div class="metric-detail">DIO: 22</div>
-            <div class="metric-detail">DPO: 110</div>
+            <div class="metric-value">{wc_values['CCC']}</div>
+            <div class="metric-detail">DSO: {wc_values['DSO']}</div>
+            <div class="metric-detail">DIO: {wc_values['DIO']}</div>
+            <div class="metric-detail">DPO: {wc_values['DPO']}</div>
     """, unsafe_allow_html=True)
     
     fig_wc = go.Figure()
     fig_wc.add_trace(go.Scatter(
-        x=months,
+        x=working_capital_data['months'],
         y=working_capital_data['dso'],
         name='DSO',
         line=dict(color='#f43f5e', width=1.5)
     ))
     fig_wc.add_trace(go.Scatter(
-        x=months,
+        x=working_capital_data['months'],
         y=working_capital_data['dio'],
         name='DIO',
         line=dict(color='#22c55e', width=1.5)
     ))
     fig_wc.add_trace(go.Scatter(
-        x=months,
+        x=working_capital_data['months'],
         y=working_capital_data['dpo'],
         name='DPO',
         line=dict(color='#3b82f6', width=1.5)
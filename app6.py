@@ -0,0 +1,52 @@
+import time
+import duckdb
+import streamlit as st
+from explorer import show_paginated
+from precompute import wait_for_statements
+from sql import EXAMPLES, query, table_columns
+
+# Check if data is available in session state
+if 'data' not in st.session_state or st.session_state.data is None:
+    st.warning("Please upload a CSV file on the main page.")
+    st.stop()
+
+df = st.session_state.data
+ledger_key = st.session_state.get('ledger_key')
+
+st.header("🔎 SQL Explorer")
+st.caption("Query the journal (`ledger`) and the statements built from it. Column names with spaces or "
+           "slashes need double quotes, e.g. `\"Supplier/client\"`.")
+
+# Statement tables are read from the cache the background jobs fill
+wait_for_statements(ledger_key)
+
+with st.expander("Tables"):
+    for name, columns in table_columns(df, key=ledger_key).items():
+        st.markdown(f"**{name}**: " + ", ".join(f"`{column}` {kind}" for column, kind in columns))
+
+
+def load_example():
+    st.session_state.sql_text = EXAMPLES[st.session_state.sql_example]
+
+
+if 'sql_text' not in st.session_state:
+    st.session_state.sql_text = next(iter(EXAMPLES.values()))
+st.selectbox("Example", list(EXAMPLES), key="sql_example", on_change=load_example)
+sql_text = st.text_area("Query", key="sql_text", height=180)
+
+if st.button("Run query", type="primary"):
+    start = time.perf_counter()
+    try:
+        result = query(df, sql_text, key=ledger_key)
+    except duckdb.Error as error:
+        st.session_state.sql_result = None
+        st.error(str(error))
+    else:
+        # Kept in the session so paging through the result does not run the query again
+        st.session_state.sql_result = (sql_text, result, time.perf_counter() - start)
+
+if st.session_state.get('sql_result'):
+    ran_text, result, elapsed = st.session_state.sql_result
+    st.caption(f"{len(result):,} rows in {elapsed * 1000:.0f} ms" +
+               (" (the query has been edited since it ran)" if ran_text != sql_text else ""))
+    show_paginated(result, "sql_result", file_name='query.csv', index=False)
@@ -0,0 +1,98 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from ingest import CHUNK_ROWS, stream_ledger
+from PL import preprocess_pl
+from BS import preprocess_bs
+from KPI import preprocess_kpi, save_kpis
+
+# Headless month-end close: python batch.py "closes/*.csv" --output-dir output
+# Run from the repository root (the chart of accounts is read from data/).
+
+
+def process_entity(input_file, output_dir, chunksize=CHUNK_ROWS):
+    # Build and write the statements of one journal file; returns its timing breakdown in seconds
+    entity = os.path.splitext(os.path.basename(input_file))[0]
+    entity_dir = os.path.join(output_dir, entity)
+    os.makedirs(entity_dir, exist_ok=True)
+    timings = {'entity': entity}
+
+    start = time.perf_counter()
+    df = stream_ledger(input_file, chunksize=chunksize)
+    timings['ingest'] = time.perf_counter() - start
+
+    step = time.perf_counter()
+    profit_loss_df = preprocess_pl(df)
+    balance_sheet_df = preprocess_bs(df, profit_loss_df)
+    kpi_df, revenue_per_product_df, top_clients_by_revenue_df = preprocess_kpi(profit_loss_df, balance_sheet_df, df)
+    timings['statements'] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    # Same file names as the exports shipped in data/
+    profit_loss_df.to_csv(os.path.join(entity_dir, 'Profit_and_Loss_Statement.csv'), index=False)
+    balance_sheet_df.to_csv(os.path.join(entity_dir, 'balanceSheet.csv'), index=False)
+    revenue_per_product_df.to_csv(os.path.join(entity_dir, 'revenue_per_product.csv'), index=False)
+    top_clients_by_revenue_df.to_csv(os.path.join(entity_dir, 'top_clients_by_revenue.csv'), index=False)
+    kpi_df.to_csv(os.path.join(entity_dir, 'kpi.csv'), index=False)
+    # Parquet keeps the period index and column dtypes for later comparisons
+    save_kpis(kpi_df, os.path.join(entity_dir, 'kpi.parquet'))
+    timings['write'] = time.perf_counter() - step
+
+    timings['total'] = time.perf_counter() - start
+    timings['months'] = len(profit_loss_df)
+    return timings
+
+
+def expand_inputs(patterns):
+    # Globs are expanded here as well, so quoted patterns work on every shell
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        files.extend(match for match in matches if match not in files)
+    return files
+
+
+def print_summary(results, failures):
+    print(f"{'Entity':<30}{'Months':>8}{'Ingest':>10}{'Statements':>12}{'Write':>8}{'Total':>8}")
+    for timings in sorted(results, key=lambda t: t['entity']):
+        print(f"{timings['entity']:<30}{timings['months']:>8}{timings['ingest']:>9.2f}s"
+              f"{timings['statements']:>11.2f}s{timings['write']:>7.2f}s{timings['total']:>7.2f}s")
+    for input_file, error in failures:
+        print(f"FAILED {input_file}: {error}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build P&L, balance sheet and KPI outputs for many journal files.")
+    parser.add_argument('inputs', nargs='+', help="Journal CSV files or glob patterns, one entity per file")
+    parser.add_argument('--output-dir', default='output', help="Outputs are written to <output-dir>/<entity>/")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help="Rows read per chunk")
+    args = parser.parse_args(argv)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        parser.error("no journal files matched")
+    entities = [os.path.splitext(os.path.basename(f))[0] for f in files]
+    duplicates = sorted({entity for entity in entities if entities.count(entity) > 1})
+    if duplicates:
+        parser.error(f"several input files map to the same entity name: {', '.join(duplicates)}")
+
+    start = time.perf_counter()
+    results, failures = [], []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(process_entity, f, args.output_dir, args.chunksize): f for f in files}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as error:
+                failures.append((futures[future], error))
+
+    print_summary(results, failures)
+    print(f"{len(results)} of {len(files)} entities processed in {time.perf_counter() - start:.2f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,167 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from ingest import clean_ledger, period_label
+from PL import preprocess_pl
+from BS import preprocess_bs
+from KPI import preprocess_kpi
+from calculations import financial_dashboard
+from statements import statement_cache
+
+# Benchmarks of the statement builders on synthetic journals:
+#   python benchmark.py --rows 10000 1000000 10000000
+#   python benchmark.py --rows 10000 --compare .cache/bench_results.json --output .cache/bench_new.json
+
+# Accounts of the chart of accounts, spelled like the exported journals
+LEDGER_ACCOUNTS = ['Sales Revenue', 'Cost of goods sold', 'Personnel', 'Facility', 'Administration',
+                   'Financial income', 'Financial Cost', 'Cash and cash equivalents', 'Accounts Receivable',
+                   'Raw material inventory', 'Property, Plant, and Equipment (PPE)', 'Intangible Assets',
+                   'Accounts Payable', 'Short-term Debt', 'Wages payables', 'Share Capital', 'Retained earnings']
+DEFAULT_ROWS = [10_000, 1_000_000, 10_000_000]
+# Results are local measurements, kept out of the repository with the other caches
+DEFAULT_OUTPUT = '.cache/bench_results.json'
+
+
+def generate_journal(rows, accounts=25, clients=50, components=10, months=24, seed=0):
+    # Seeded synthetic journal with the columns of data/journalEntry.csv, as read_csv returns them.
+    # Accounts beyond the chart of accounts are unmapped 'Balance sheet ...' counterpart accounts.
+    rng = np.random.default_rng(seed)
+    account_names = LEDGER_ACCOUNTS[:accounts] + [f'Balance sheet {i}' for i in range(max(0, accounts - len(LEDGER_ACCOUNTS)))]
+    client_names = np.array([f'Client {i}' for i in range(1, clients + 1)], dtype=object)
+    component_names = np.array([f'Product {chr(65 + i % 26)}{i // 26 or ""}' for i in range(components)], dtype=object)
+
+    first = 2022 * 12
+    periods = first + rng.integers(0, months, rows)
+    days = rng.integers(1, 29, rows)
+    dates = [f'{period_label(period)}-{day:02d}' for period, day in zip(periods, days)]
+    amounts = rng.gamma(2.0, 5_000.0, rows).round(2)
+    is_debit = rng.random(rows) < 0.5
+    debit = np.where(is_debit, amounts, np.nan)
+    credit = np.where(is_debit, np.nan, amounts)
+
+    return pd.DataFrame({
+        'Date': dates,
+        'Month': periods % 12 + 1,
+        'Year': periods // 12,
+        'Journal Entry ID': np.arange(1, rows + 1),
+        'Account': np.array(account_names, dtype=object)[rng.integers(0, len(account_names), rows)],
+        'Debit': debit,
+        'Credit': credit,
+        'Solde': np.where(is_debit, amounts, -amounts),
+        'Description': None,
+        'Document Reference': None,
+        'Currency': 'USD',
+        'Supplier/client': client_names[rng.integers(0, clients, rows)],
+        'Component': component_names[rng.integers(0, components, rows)],
+    })
+
+
+def measure(fn, repeat):
+    # Best wall time over `repeat` runs, then one traced run for the peak Python/NumPy allocation
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak / 2**20
+
+
+def benchmark_rows(rows, repeat, **generator_options):
+    raw = generate_journal(rows, **generator_options)
+    df = clean_ledger(raw.copy())
+    profit_loss_df = preprocess_pl(df)
+    balance_sheet_df = preprocess_bs(df, profit_loss_df)
+    year, month = int(df['Year'].iloc[0]), int(df['Month'].iloc[0])
+
+    def dashboard():
+        # Measure the cold path: the period cube is rebuilt on every call
+        statement_cache.clear()
+        financial_dashboard(df, 'sales revenue', 'cost of goods sold', ['personnel', 'facility', 'administration'],
+                            month, year, key='benchmark')
+
+    builders = {
+        'ingest.clean_ledger': lambda: clean_ledger(raw.copy()),
+        'PL.preprocess_pl': lambda: preprocess_pl(df),
+        'BS.preprocess_bs': lambda: preprocess_bs(df, profit_loss_df),
+        'KPI.preprocess_kpi': lambda: preprocess_kpi(profit_loss_df, balance_sheet_df, df),
+        'calculations.financial_dashboard': dashboard,
+    }
+    results = []
+    for name, fn in builders.items():
+        seconds, peak_mb = measure(fn, repeat)
+        results.append({'builder': name, 'rows': rows, 'seconds': round(seconds, 6), 'peak_mb': round(peak_mb, 3)})
+        print(f"{name:<36}{rows:>12,}{seconds:>10.3f}s{peak_mb:>10.1f} MB")
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_file):
+    # Print the time and memory ratio of every (builder, rows) pair against an earlier results file
+    with open(baseline_file) as f:
+        baseline = {(r['builder'], r['rows']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {baseline_file}")
+    for result in results:
+        before = baseline.get((result['builder'], result['rows']))
+        if before and before['seconds'] and before['peak_mb']:
+            print(f"{result['builder']:<36}{result['rows']:>12,}"
+                  f"{result['seconds'] / before['seconds']:>9.2f}x time{result['peak_mb'] / before['peak_mb']:>9.2f}x memory")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the statement builders on synthetic journals.")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--accounts', type=int, default=25)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--components', type=int, default=10)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per builder (the best is kept)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    generator_options = dict(accounts=args.accounts, clients=args.clients, components=args.components,
+                             months=args.months, seed=args.seed)
+    results = []
+    for rows in args.rows:
+        results.extend(benchmark_rows(rows, args.repeat, **generator_options))
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'generator': generator_options,
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
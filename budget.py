@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+# Columns of data/budget.csv (lowercased) and the P&L line each one budgets
+BUDGET_LINES = {
+    'sales revenue': 'Sales Revenue',
+    'cost of goods sold': 'Cost of Goods Sold',
+    'gross margin': 'Gross Margin',
+    'personnel': 'Personnel',
+    'facility': 'Facility',
+    'administration': 'Administration',
+    'ebitda': 'EBITDA',
+    'financial income': 'Financial Income',
+    'financial cost': 'Financial Cost',
+    'net result': 'Net Result',
+    'margin (%)': 'Gross Margin (%)',
+}
+# Ratio lines are recomputed from their YTD / projected components instead of being summed
+RATIO_LINES = {'Gross Margin (%)': ('Gross Margin', 'Sales Revenue')}
+
+
+def load_budget(path='data/budget.csv'):
+    # Monthly budget in K$ (the same for every year), indexed by Month with P&L line names as columns
+    budget = pd.read_csv(path)
+    budget.columns = [col.strip().lower() for col in budget.columns]
+    budget = budget.set_index('month').rename(columns=BUDGET_LINES)
+    budget.index.name = 'Month'
+    return budget[[line for line in BUDGET_LINES.values() if line in budget.columns]].astype('float64')
+
+
+def percent_change(actual, reference):
+    # Same convention as the KPI cards: relative to the reference, 0 when there is no reference
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = (actual - reference) / reference * 100
+    return change.where(reference != 0, 0)
+
+
+def ratio(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (numerator / denominator * 100).where(denominator != 0, 0)
+
+
+def budget_variance(profit_loss_df, budget_df):
+    # Budget vs actual for every P&L month and budgeted line, in K$, one row per (Year, Month, Line):
+    # month, YTD and full-year projection (YTD actual plus the budget of the remaining months)
+    lines = list(budget_df.columns)
+    actual = profit_loss_df.set_index(['Year', 'Month'])[lines].sort_index() / 1000
+    for line in RATIO_LINES:
+        if line in lines:
+            actual[line] *= 1000
+
+    # The budget of each month is repeated for every year of the ledger
+    years = actual.index.get_level_values('Year')
+    budget = budget_df.reindex(actual.index.get_level_values('Month'))
+    budget.index = actual.index
+
+    ytd_actual = actual.groupby(years).cumsum()
+    ytd_budget = budget.groupby(years).cumsum()
+    full_year = budget_df.sum()
+    # Budget still to come after each calendar month, so months missing from the ledger (a ledger starting
+    # mid-year, gaps) are not counted as remaining budget
+    remaining = (full_year - budget_df.sort_index().cumsum()).reindex(actual.index.get_level_values('Month'))
+    remaining.index = actual.index
+    projection = ytd_actual + remaining
+    full_year = pd.DataFrame([full_year] * len(actual), index=actual.index)
+    for line, (numerator, denominator) in RATIO_LINES.items():
+        if line in lines and numerator in lines and denominator in lines:
+            for frame in (ytd_actual, ytd_budget, projection, full_year):
+                frame[line] = ratio(frame[numerator], frame[denominator])
+
+    table = pd.DataFrame({
+        'Actual': actual.stack(),
+        'Budget': budget.stack(),
+        'YTD Actual': ytd_actual.stack(),
+        'YTD Budget': ytd_budget.stack(),
+        'Full-Year Budget': full_year.stack(),
+        'Projection': projection.stack(),
+    })
+    table.index.names = ['Year', 'Month', 'Line']
+    table['Variance'] = table['Actual'] - table['Budget']
+    table['Variance (%)'] = percent_change(table['Actual'], table['Budget'])
+    table['YTD Variance'] = table['YTD Actual'] - table['YTD Budget']
+    table['YTD Variance (%)'] = percent_change(table['YTD Actual'], table['YTD Budget'])
+    table['Projection Variance (%)'] = percent_change(table['Projection'], table['Full-Year Budget'])
+    return table[['Actual', 'Budget', 'Variance', 'Variance (%)', 'YTD Actual', 'YTD Budget', 'YTD Variance',
+                  'YTD Variance (%)', 'Full-Year Budget', 'Projection', 'Projection Variance (%)']]
+
+
+def variance_row(table, line, year, month):
+    # One line of the variance table; zeros for months outside the ledger
+    try:
+        return table.loc[(year, month, line)]
+    except KeyError:
+        return pd.Series(0.0, index=table.columns)
+
+
+def kpi_cards(table, year, month):
+    # Figures shown on the KPI cards of the dashboard pages, all read from the variance table
+    sales = variance_row(table, 'Sales Revenue', year, month)
+    previous_year, previous_month = divmod(year * 12 + month - 2, 12)
+    previous_sales = variance_row(table, 'Sales Revenue', previous_year, previous_month + 1)
+    margin = variance_row(table, 'Gross Margin (%)', year, month)
+    ebitda = variance_row(table, 'EBITDA', year, month)
+    change_from_previous = ((sales['Actual'] - previous_sales['Actual']) / previous_sales['Actual']) * 100 \
+        if previous_sales['Actual'] != 0 else 0
+    cards = {
+        'Sales Revenue (K$)': sales['Actual'],
+        'Budget (K$)': sales['Budget'],
+        'Variance from Budget (%)': sales['Variance (%)'],
+        'Previous Sales Revenue (K$)': previous_sales['Actual'],
+        'Variance from Previous (%)': change_from_previous,
+        'Margin (%)': margin['Actual'],
+        'EBITDA (K$)': ebitda['Actual'],
+        'EBITDA Variance from Budget (%)': ebitda['Variance (%)'],
+        'YTD Sales Revenue (K$)': sales['YTD Actual'],
+        'YTD Variance from Budget (%)': sales['YTD Variance (%)'],
+        'Projected Sales Revenue (K$)': sales['Projection'],
+        'Projection Variance (%)': sales['Projection Variance (%)'],
+    }
+    return {name: round(float(value), 2) for name, value in cards.items()}
@@ -1,11 +1,13 @@
-def financial_dashboard(df, sales_account, cogs_account, opex_accounts, current_month, current_year):
-    # Filter data for the selected month and year
-    filtered_df = df[(df['Month'] == current_month) & (df['Year'] == current_year)]
-    
+def financial_dashboard(df, sales_account, cogs_account, opex_accounts, current_month, current_year, key=None):
+    # Read the selected month from the (period x line) cube instead of filtering the ledger.
+    # statements (and pandas with it) is imported here so importing this module stays cheap.
+    from statements import period_cube
+    cube = period_cube(df, key=key)
+
     # Calculate metrics
-    sales_revenue = -filtered_df[filtered_df['Account'] == sales_account]['Solde'].sum()
-    cogs = filtered_df[filtered_df['Account'] == cogs_account]['Solde'].sum()
-    opex = filtered_df[filtered_df['Account'].isin(opex_accounts)]['Solde'].sum()
+    sales_revenue = -cube.value(sales_account, current_year, current_month)
+    cogs = cube.value(cogs_account, current_year, current_month)
+    opex = cube.value(opex_accounts, current_year, current_month)
     
     gross_margin = sales_revenue - cogs
     ebitda = gross_margin - opex
@@ -19,4 +21,4 @@ def financial_dashboard(df, sales_account, cogs_account, opex_accounts, current_
         'OPEX': opex,
         'EBITDA': ebitda,
         'Margin (%)': margin_percentage
-    }
\ No newline at end of file
+    }
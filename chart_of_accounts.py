@@ -0,0 +1,48 @@
+import os
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+# Next to this module, so the chart loads whatever directory the app is started from
+CHART_OF_ACCOUNTS_FILE = os.path.join(os.path.dirname(__file__), 'data', 'chart_of_accounts.csv')
+
+# Code given to ledger rows whose account is not in the chart of accounts
+UNMAPPED = 0
+# Code returned when looking up a name that is not in the chart of accounts (never matches a ledger row)
+NO_LINE = -1
+
+
+def normalize_account(account):
+    return str(account).strip().lower()
+
+
+@lru_cache(maxsize=None)
+def load_chart_of_accounts(path=CHART_OF_ACCOUNTS_FILE):
+    # Loaded once per process: {normalized account name: integer line-item code}
+    coa = pd.read_csv(path)
+    return {normalize_account(account): int(code) for account, code in zip(coa['Account'], coa['Code'])}
+
+
+def line_code(account):
+    return load_chart_of_accounts().get(normalize_account(account), NO_LINE)
+
+
+def line_codes(accounts):
+    return [line_code(account) for account in accounts]
+
+
+def get_line_codes(df):
+    # Use the codes assigned at ingest, otherwise compile them from the Account column
+    if 'Line Code' in df.columns:
+        return df['Line Code']
+    accounts = df['Account'].astype('category')
+    chart = load_chart_of_accounts()
+    # Map each distinct account once; the trailing UNMAPPED catches missing accounts (category code -1)
+    codes = [chart.get(normalize_account(account), UNMAPPED) for account in accounts.cat.categories]
+    codes = np.array(codes + [UNMAPPED], dtype='int16')
+    return pd.Series(codes[accounts.cat.codes.to_numpy()], index=df.index, name='Line Code')
+
+
+def assign_line_codes(df):
+    df['Line Code'] = get_line_codes(df)
+    return df
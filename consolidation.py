@@ -0,0 +1,166 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from chart_of_accounts import normalize_account
+from ingest import AGGREGATE_KEYS, CHUNK_ROWS, NUMERIC_COLUMNS, compact_ledger, period_key, period_label, stream_ledger
+from PL import preprocess_pl
+from BS import preprocess_bs
+from batch import expand_inputs
+
+# Group consolidation of several subsidiaries' journals:
+#   python consolidation.py "subsidiaries/*.csv" --fx-rates data/fx_rates.csv --currency USD --output-dir output
+# The rates table has one row per currency and month: Currency,Year-Month,Rate, where Rate is the amount of
+# reporting currency for one unit of Currency (e.g. EUR,2022-01,1.13). No rates file ships with the repo:
+# without one every entity must already report in the group currency.
+FX_RATES_PATH = 'data/fx_rates.csv'
+REPORTING_CURRENCY = 'USD'
+
+
+def load_fx_rates(path=FX_RATES_PATH):
+    # Rates as a (period x currency) table; a missing file means every entity reports in the group currency
+    if not os.path.exists(path):
+        return pd.DataFrame(dtype='float64')
+    rates = pd.read_csv(path)
+    parts = rates['Year-Month'].str.split('-', expand=True).astype(int)
+    rates['Period'] = period_key(parts[0], parts[1])
+    rates['Currency'] = rates['Currency'].str.strip().str.upper()
+    return rates.pivot_table(index='Period', columns='Currency', values='Rate', aggfunc='last')
+
+
+def row_currencies(chunk, functional_currency):
+    # Currency of each row: the Currency column when it holds an ISO code, the entity's currency otherwise.
+    # The column is categorical, so the codes are checked once per distinct value.
+    if 'Currency' not in chunk.columns:
+        return pd.Series(functional_currency, index=chunk.index)
+    currency = chunk['Currency'].astype('category')
+    labels = currency.cat.categories.astype(str).str.strip().str.upper()
+    labels = labels.where(labels.str.fullmatch('[A-Z]{3}'), functional_currency)
+    codes = currency.cat.codes.to_numpy()
+    return pd.Series(np.where(codes >= 0, np.asarray(labels, dtype=object)[codes], functional_currency),
+                     index=chunk.index)
+
+
+def translate(chunk, rates, functional_currency=REPORTING_CURRENCY, reporting_currency=REPORTING_CURRENCY):
+    # Convert the amounts of a cleaned ledger chunk to the reporting currency at the rate of their period
+    currencies = row_currencies(chunk, functional_currency)
+    rate = np.ones(len(chunk))
+    periods = chunk['Period'].to_numpy()
+    for currency in currencies.unique():
+        if currency == reporting_currency:
+            continue
+        if currency not in rates.columns:
+            raise ValueError(f"No FX rates for {currency}")
+        mask = (currencies == currency).to_numpy()
+        rate[mask] = rates[currency].reindex(periods[mask]).to_numpy()
+        missing = mask & np.isnan(rate)
+        if missing.any():
+            months = sorted({period_label(period) for period in periods[missing]})
+            raise ValueError(f"No {currency} rate for {', '.join(months)}")
+    chunk = chunk.copy()
+    for col in NUMERIC_COLUMNS:
+        chunk[col] = chunk[col].to_numpy() * rate
+    return chunk
+
+
+def eliminate_intercompany(chunk, entities, intercompany_accounts=(), entity=None):
+    # Drop rows posted against another group entity (by Supplier/client) or to a designated intercompany
+    # account. Both sides of an intercompany transaction are dropped, so they net to zero in the group.
+    # Rows whose counterparty is the entity itself are kept: they are not a transaction with another member.
+    counterparties = {name.strip() for name in entities} - {entity.strip() if entity else None}
+    intercompany = chunk['Supplier/client'].astype(str).str.strip().isin(counterparties)
+    if intercompany_accounts:
+        accounts = {normalize_account(account) for account in intercompany_accounts}
+        intercompany |= chunk['Account'].astype(str).isin(accounts)
+    return chunk[~intercompany]
+
+
+def prepare_entity(source, rates, entities, functional_currency=REPORTING_CURRENCY,
+                   reporting_currency=REPORTING_CURRENCY, intercompany_accounts=(), chunksize=CHUNK_ROWS):
+    # One entity's compact ledger in the reporting currency, without intercompany rows (runs in a worker)
+    entity = entity_name(source)
+
+    def transform(chunk):
+        chunk = translate(chunk, rates, functional_currency, reporting_currency)
+        return eliminate_intercompany(chunk, entities, intercompany_accounts, entity)
+    return stream_ledger(source, chunksize=chunksize, transform=transform)
+
+
+def entity_name(source):
+    return os.path.splitext(os.path.basename(source))[0]
+
+
+def consolidate(sources, rates=None, reporting_currency=REPORTING_CURRENCY, functional_currencies=None,
+                intercompany_accounts=(), workers=None, chunksize=CHUNK_ROWS):
+    # Consolidated (ledger, profit_loss_df, balance_sheet_df) of several entity journals. Entities are read,
+    # translated and eliminated in parallel worker processes; only their compact ledgers are combined here.
+    rates = load_fx_rates() if rates is None else rates
+    functional_currencies = functional_currencies or {}
+    entities = [entity_name(source) for source in sources]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(prepare_entity, source, rates, entities,
+                               functional_currencies.get(entity, reporting_currency), reporting_currency,
+                               tuple(intercompany_accounts), chunksize)
+                   for source, entity in zip(sources, entities)]
+        parts = [future.result() for future in futures]
+
+    totals = pd.concat([part[AGGREGATE_KEYS + NUMERIC_COLUMNS].astype({'Component': str, 'Supplier/client': str})
+                        for part in parts])
+    ledger = compact_ledger(totals.groupby(AGGREGATE_KEYS)[NUMERIC_COLUMNS].sum().reset_index())
+    profit_loss_df = preprocess_pl(ledger)
+    balance_sheet_df = preprocess_bs(ledger, profit_loss_df)
+    return ledger, profit_loss_df, balance_sheet_df
+
+
+def parse_currencies(values):
+    # ENTITY=CUR pairs from the command line
+    currencies = {}
+    for value in values or []:
+        entity, _, currency = value.partition('=')
+        currencies[entity] = currency.strip().upper()
+    return currencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consolidate several entity journals into group statements.")
+    parser.add_argument('inputs', nargs='+', help="Journal CSV files or glob patterns, one entity per file")
+    parser.add_argument('--fx-rates', default=FX_RATES_PATH,
+                        help="Currency,Year-Month,Rate table (default: %(default)s). Required when an entity "
+                             "reports in another currency than --currency")
+    parser.add_argument('--currency', default=REPORTING_CURRENCY, help="Reporting currency of the group")
+    parser.add_argument('--entity-currency', action='append', metavar='ENTITY=CUR',
+                        help="Functional currency of an entity whose rows carry no currency code "
+                             "(a currency other than --currency needs --fx-rates)")
+    parser.add_argument('--intercompany-account', action='append', default=[],
+                        help="Account eliminated on consolidation (repeatable)")
+    parser.add_argument('--output-dir', default='output', help="Statements are written to <output-dir>/consolidated/")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS, help="Rows read per chunk")
+    args = parser.parse_args(argv)
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        parser.error("no journal files matched")
+    rates = load_fx_rates(args.fx_rates)
+    currencies = parse_currencies(args.entity_currency)
+    foreign = sorted({currency for currency in currencies.values() if currency != args.currency.upper()})
+    missing = [currency for currency in foreign if currency not in rates.columns]
+    if missing:
+        parser.error(f"no FX rates for {', '.join(missing)} in {args.fx_rates}; pass a rates file with --fx-rates")
+    start = time.perf_counter()
+    _, profit_loss_df, balance_sheet_df = consolidate(
+        files, rates, args.currency.upper(), currencies,
+        args.intercompany_account, args.workers, args.chunksize
+    )
+    output_dir = os.path.join(args.output_dir, 'consolidated')
+    os.makedirs(output_dir, exist_ok=True)
+    profit_loss_df.to_csv(os.path.join(output_dir, 'Profit_and_Loss_Statement.csv'), index=False)
+    balance_sheet_df.to_csv(os.path.join(output_dir, 'balanceSheet.csv'), index=False)
+    print(f"{len(files)} entities consolidated in {time.perf_counter() - start:.2f}s into {output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,33 @@
+import numpy as np
+from chart_of_accounts import line_code, get_line_codes
+from ingest import period_key
+
+
+class PeriodCube:
+    # Solde totals per (period, line-item code), built in one pass over the ledger.
+    # A month's figure for any account is then a plain array lookup.
+    def __init__(self, df):
+        codes = get_line_codes(df).to_numpy().astype('int64')
+        if 'Period' in df.columns:
+            periods = df['Period'].to_numpy().astype('int64')
+        else:
+            periods = period_key(df['Year'].to_numpy().astype('int64'), df['Month'].to_numpy().astype('int64'))
+        self.first = int(periods.min()) if len(periods) else 0
+        n_periods = int(periods.max()) - self.first + 1 if len(periods) else 0
+        self.n_lines = int(codes.max()) + 1 if len(codes) else 1
+        flat = (periods - self.first) * self.n_lines + codes
+        self.solde = np.bincount(flat, weights=df['Solde'].to_numpy(), minlength=n_periods * self.n_lines)
+        self.solde = self.solde.reshape(n_periods, self.n_lines)
+
+    def _lookup(self, table, accounts, year, month):
+        row = period_key(year, month) - self.first
+        if row < 0 or row >= len(table):
+            return 0.0
+        if isinstance(accounts, str):
+            accounts = [accounts]
+        codes = [code for code in (line_code(account) for account in accounts) if 0 <= code < self.n_lines]
+        return float(table[row, codes].sum())
+
+    def value(self, accounts, year, month):
+        # Solde of one account (or the sum of several) for the month
+        return self._lookup(self.solde, accounts, year, month)
@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from calculations import financial_dashboard
+from budget import kpi_cards, load_budget
+from statements import variance_table
 from revenue_analysis import revenue_analysis_page
 
 # Set page config
@@ -20,16 +21,19 @@ if page == "Dashboard":
 
     budget_df = load_data()
 
+    if 'data' not in st.session_state or st.session_state.data is None:
+        st.warning("Please upload a CSV file on the main page.")
+        st.stop()
+    ledger_df = st.session_state.data
+
     # Sidebar
     st.sidebar.title("Dashboard Controls")
     selected_month = st.sidebar.selectbox("Select Month", range(1, 13), format_func=lambda x: f"Month {x}")
-    selected_year = st.sidebar.selectbox("Select Year", [2022])
+    selected_year = st.sidebar.selectbox("Select Year", [int(year) for year in sorted(ledger_df['Year'].unique())])
 
-    # Calculate financial metrics
-    sales_account = 'Sales Revenue'
-    cogs_account = 'Cost of goods sold'
-    opex_accounts = ['Personnel', 'Facility', 'Administration']
-    metrics = financial_dashboard(sales_account, cogs_account, opex_accounts, selected_month, selected_year)
+    # Calculate financial metrics from the budget-vs-actual table of the uploaded ledger
+    metrics = kpi_cards(variance_table(ledger_df, load_budget('data/budget.csv'), key=st.session_state.get('ledger_key')),
+                        selected_year, selected_month)
 
     # Main dashboard
     st.title("CEO Financial Dashboard")
@@ -52,11 +56,13 @@ if page == "Dashboard":
     with col5:
         st.metric("EBITDA", f"${metrics['EBITDA (K$)']:,.2f}K")
     with col6:
-        st.metric("DSO", f"{metrics['DSO (days)']} days")
+        st.metric("EBITDA vs Budget", f"{metrics['EBITDA Variance from Budget (%)']}%")
     with col7:
-        st.metric("DIO", f"{metrics['DIO (days)']} days")
+        st.metric("YTD Sales Revenue", f"${metrics['YTD Sales Revenue (K$)']:,.2f}K",
+                  f"{metrics['YTD Variance from Budget (%)']}% vs Budget")
     with col8:
-        st.metric("DPO", f"{metrics['DPO (days)']} days")
+        st.metric("Full-Year Projection", f"${metrics['Projected Sales Revenue (K$)']:,.2f}K",
+                  f"{metrics['Projection Variance (%)']}% vs Budget")
 
     # Charts
     st.subheader("Monthly Financial Performance")
@@ -2,25 +2,33 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+from instrumentation import instrumented
+from explorer import show_paginated
+from statements import cached, rolling_pl
+from KPI import compare_periods
+from figures import cached_figure, frame_key, prefetch, px_figure
 
+# Imported by pages that already checked for an uploaded ledger; importing it has no side effects.
+# Charts come from the figure cache, which imports plotly on the first figure it builds.
 
-if 'data' not in st.session_state or st.session_state.data is None:
-    st.warning("Please upload a CSV file on the main page.")
-    st.stop()
+# Months on each side of the viewed one whose top-clients chart is built ahead of time
+TOP_CLIENTS_PREFETCH = 1
 
 # Use the data and filters from session state
 #df = st.session_state.data
 #current_month = st.session_state.selected_month
 #current_year = st.session_state.selected_year
 
+@instrumented('display_bs')
 def display_bs(balance_sheet_df):
     st.header("💼 Balance Sheet")
-    st.dataframe(balance_sheet_df)
+    show_paginated(balance_sheet_df, "balance_sheet", file_name='balanceSheet.csv', index=False)
 
 
 
+@instrumented('display_es')
 def display_es(kpi_df, pl_df):
+    pl_key = frame_key('profit_loss', pl_df, st.session_state.get('ledger_key'))
     st.header("🔑 Key Performance Indicators (KPIs)")
     current_month = st.session_state.selected_month
     current_year = st.session_state.selected_year
@@ -32,24 +40,29 @@ def display_es(kpi_df, pl_df):
     # Filter and display KPIs in a table
     st.dataframe(filtered_kpi.set_index('Year-Month'))
 
+    # Same KPIs against the previous month
+    st.dataframe(compare_periods(kpi_df, current_year, current_month))
+
     # Visualizations using pl_df (unfiltered)
     st.subheader("💰 Sales Revenue Over Time")
-    fig_sales = px.line(pl_df, x='Year-Month', y='Sales Revenue', title='Sales Revenue Over Time')
+    fig_sales = px_figure('line', pl_df, key=pl_key, x='Year-Month', y='Sales Revenue', title='Sales Revenue Over Time')
     st.plotly_chart(fig_sales, use_container_width=True, key="sales_select")
 
     st.subheader("📈 Gross Margin Over Time")
-    fig_margin = px.line(pl_df, x='Year-Month', y='Gross Margin (%)', title='Gross Margin Over Time')
+    fig_margin = px_figure('line', pl_df, key=pl_key, x='Year-Month', y='Gross Margin (%)', title='Gross Margin Over Time')
     st.plotly_chart(fig_margin, use_container_width=True, key="margin_select")
 
     st.subheader("📊 EBITDA Over Time")
-    fig_ebitda = px.bar(pl_df, x='Year-Month', y='EBITDA', title='EBITDA Over Time')
+    fig_ebitda = px_figure('bar', pl_df, key=pl_key, x='Year-Month', y='EBITDA', title='EBITDA Over Time')
     st.plotly_chart(fig_ebitda, use_container_width=True, key="ebitda_select")
 
     st.subheader("📉 Net Result Over Time")
-    fig_net = px.line(pl_df, x='Year-Month', y='Net Result', title='Net Result Over Time')
+    fig_net = px_figure('line', pl_df, key=pl_key, x='Year-Month', y='Net Result', title='Net Result Over Time')
     st.plotly_chart(fig_net, use_container_width=True, key="net_result_select")
 
+@instrumented('display_pl')
 def display_pl(pl_df):
+    pl_key = frame_key('profit_loss', pl_df, st.session_state.get('ledger_key'))
     st.header("Profit & Loss Statement")
     current_month = st.session_state.selected_month
     tab1, tab2 = st.tabs(["Page Profit & Loss","LTM Profit & Loss"])
@@ -57,31 +70,42 @@ def display_pl(pl_df):
         st.header("Profit & Loss Statement")
         current_month = st.session_state.selected_month
         current_year = st.session_state.selected_year
-        filtered_pl = pl_df[
-            (pl_df['Month'] == current_month) &
-            (pl_df['Year'] == current_year)
-        ]
+        # One P&L row per month: look the selected month up by its label
+        filtered_pl = pl_df.set_index('Year-Month').reindex([f"{current_year}-{current_month:02d}"]).dropna(how='all')
 
 
         # Filter and display P&L in a table
         #filtered_pl = pl_df[pl_df['Year-Month'].isin(current_month)]
-        st.dataframe(filtered_pl.set_index('Year-Month'))
+        st.dataframe(filtered_pl)
 
         # Visualizations using pl_df (unfiltered)
         st.subheader("📊 Revenue vs. Expenses Over Time")
-        fig_rev_exp = px.line(pl_df, x='Year-Month', y=['Sales Revenue', 'Cost of Goods Sold', 'Gross Margin'],
+        fig_rev_exp = px_figure('line', pl_df, key=pl_key, x='Year-Month',
+                                y=['Sales Revenue', 'Cost of Goods Sold', 'Gross Margin'],
                                 title='Revenue vs. Expenses Over Time')
         st.plotly_chart(fig_rev_exp, use_container_width=True, key="rev_exp_select")
 
         st.subheader("💰 Operating Expenses Breakdown")
-        fig_opex = px.area(pl_df, x='Year-Month', y=['Personnel', 'Facility', 'Administration'],
-                            title='Operating Expenses Breakdown')
+        fig_opex = px_figure('area', pl_df, key=pl_key, x='Year-Month', y=['Personnel', 'Facility', 'Administration'],
+                             title='Operating Expenses Breakdown')
         st.plotly_chart(fig_opex, use_container_width=True, key="opex_select")
     with tab2:
         st.header(" Profit & Loss Statement LTM")
-        # Filter and display P&L in a table
-        #filtered_pl = pl_df[pl_df['Year-Month'].dt.strftime('%Y-%m').isin(current_month)]
-        st.dataframe(pl_df.set_index('Year-Month'))
+        # Trailing-window, QTD and YTD figures as of any month, read from prefix sums of the monthly P&L
+        rolling = rolling_pl(pl_df)
+        if rolling.labels:
+            selected = f"{current_year}-{current_month:02d}"
+            col1, col2 = st.columns(2)
+            as_of = col1.selectbox("As of", rolling.labels,
+                                   index=rolling.labels.index(selected) if selected in rolling.labels else len(rolling.labels) - 1,
+                                   key="pl_ltm_as_of")
+            window = col2.number_input("Window (months)", min_value=1, max_value=120, value=12, step=1, key="pl_ltm_window")
+            year, month = (int(part) for part in as_of.split('-'))
+            st.dataframe(rolling.as_of(year, month, window))
+
+            st.subheader("📅 Rolling Profit & Loss")
+            show_paginated(rolling.series('window', window).set_index('Year-Month'), "pl_ltm",
+                           file_name='Profit_and_Loss_Statement_LTM.csv')
 
         # Visualizations using pl_df (unfiltered)
         #st.subheader("📊 Revenue vs. Expenses Over Time")
@@ -90,14 +114,42 @@ def display_pl(pl_df):
        # st.plotly_chart(fig_rev_exp, use_container_width=True, key="rev_exp_select")
 
         st.subheader("💰 Operating Expenses Breakdown")
-        fig_opex = px.area(pl_df, x='Year-Month', y=['Personnel', 'Facility', 'Administration'],
-                            title='Operating Expenses Breakdown')
+        fig_opex = px_figure('area', pl_df, key=pl_key, x='Year-Month', y=['Personnel', 'Facility', 'Administration'],
+                             title='Operating Expenses Breakdown')
         st.plotly_chart(fig_opex, use_container_width=True,key="pl_month_select")
 
 
 
 
 
+def top_clients_slices(top_clients_by_revenue_df):
+    # The top clients of each month, split once, with the colours and revenue axis shared by every month
+    # so that moving between months only changes the bars
+    import plotly.express as px
+    frames = {str(period): frame for period, frame in top_clients_by_revenue_df.groupby('Year-Month', sort=True)}
+    palette = px.colors.qualitative.Plotly
+    clients = sorted(top_clients_by_revenue_df['Supplier/client'].astype(str).unique())
+    revenue = top_clients_by_revenue_df['Revenue']
+    low, high = min(revenue.min(), 0), max(revenue.max(), 0)
+    return {
+        'periods': list(frames),
+        'frames': frames,
+        'colors': {client: palette[i % len(palette)] for i, client in enumerate(clients)},
+        'range': [low * 1.05, high * 1.05],
+    }
+
+
+def top_clients_figure(slices, period, key):
+    # Bar chart of one month's top clients; only this month's rows go into the figure
+    def build():
+        import plotly.express as px
+        return px.bar(slices['frames'][period], x='Supplier/client', y='Revenue', color='Supplier/client',
+                      color_discrete_map=slices['colors'], range_y=slices['range'],
+                      title=f'Top 5 Clients by Revenue ({period})')
+    return cached_figure('top_clients', slices['frames'][period], build, key=key, period=period)
+
+
+@instrumented('display_revenue')
 def display_revenue(revenue_per_product_df,top_clients_by_revenue_df):
     
 
@@ -105,15 +157,35 @@ def display_revenue(revenue_per_product_df,top_clients_by_revenue_df):
     #st.header("📈 Additional Insights")
 
     st.subheader("🏆 Top 5 Clients by Revenue")
-    fig_top_clients = px.bar(top_clients_by_revenue_df, x='Supplier/client', y='Revenue', color='Supplier/client',
-                             title='Top 5 Clients by Revenue', animation_frame='Year-Month')
-    st.plotly_chart(fig_top_clients, use_container_width=True)
+    # One month is sent to the browser at a time instead of an animation holding every month
+    key = frame_key('top_clients', top_clients_by_revenue_df, st.session_state.get('ledger_key'))
+    slices = cached('top_clients_slices', top_clients_by_revenue_df,
+                    lambda: top_clients_slices(top_clients_by_revenue_df), key=key)
+    periods = slices['periods']
+    if periods:
+        selected = f"{st.session_state.selected_year}-{st.session_state.selected_month or 0:02d}"
+        # A month kept from a previous ledger is not a valid option any more
+        if st.session_state.get("top_clients_period", periods[0]) not in periods:
+            del st.session_state["top_clients_period"]
+        period = st.select_slider("Month", options=periods, value=selected if selected in periods else periods[-1],
+                                  key="top_clients_period")
+        st.plotly_chart(top_clients_figure(slices, period, key), use_container_width=True, key="top_clients_select")
+        # Scrubbing to a neighbouring month finds its chart already built
+        position = periods.index(period)
+        for neighbour in periods[max(position - TOP_CLIENTS_PREFETCH, 0):position + TOP_CLIENTS_PREFETCH + 1]:
+            if neighbour != period:
+                prefetch(('top_clients', key, neighbour), top_clients_figure, slices, neighbour, key)
 
     st.subheader("📦 Revenue per Product")
-    # Group by component and sum revenue
-    revenue_per_product = revenue_per_product_df.groupby('Component')['Revenue'].sum()
-    fig_revenue_product = px.pie(revenue_per_product, names=revenue_per_product.index, values='Revenue',
-                                 title='Total Revenue per Product')
+    def revenue_product_pie():
+        import plotly.express as px
+        # Group by component and sum revenue
+        revenue_per_product = revenue_per_product_df.groupby('Component', observed=True)['Revenue'].sum()
+        return px.pie(revenue_per_product, names=revenue_per_product.index, values='Revenue',
+                      title='Total Revenue per Product')
+    fig_revenue_product = cached_figure('revenue_per_product', revenue_per_product_df, revenue_product_pie,
+                                        key=frame_key('revenue_per_product', revenue_per_product_df,
+                                                      st.session_state.get('ledger_key')))
     st.plotly_chart(fig_revenue_product, use_container_width=True, key="revenue_product_select")
 
 
@@ -0,0 +1,136 @@
+import io
+import numpy as np
+import pandas as pd
+import streamlit as st
+from ingest import period_key, period_label
+from statements import cached
+
+PAGE_SIZES = [25, 50, 100, 250]
+# Rows encoded per step of the CSV export
+EXPORT_CHUNK_ROWS = 100_000
+
+
+class TransactionIndex:
+    # Row positions of the ledger sorted by period, plus per-row category codes of the account and client,
+    # so a filter is a binary search and a couple of integer comparisons instead of a scan of the frame
+    def __init__(self, df):
+        self.df = df
+        if 'Period' in df.columns:
+            periods = df['Period'].to_numpy().astype('int64')
+        else:
+            periods = period_key(df['Year'].to_numpy().astype('int64'), df['Month'].to_numpy().astype('int64'))
+        self.order = np.argsort(periods, kind='stable')
+        self.sorted_periods = periods[self.order]
+        self.accounts = df['Account'].astype('category')
+        self.clients = df['Supplier/client'].astype('category')
+
+    def periods(self):
+        # (period, 'YYYY-MM') pairs present in the ledger
+        return [(period, period_label(period)) for period in np.unique(self.sorted_periods)]
+
+    def _codes(self, column, values):
+        codes = column.cat.categories.get_indexer(list(values))
+        return column.cat.codes.to_numpy(), codes[codes >= 0]
+
+    def query(self, start=None, end=None, accounts=None, clients=None):
+        # Row positions matching the filters, in (period, ledger) order; start/end are inclusive period keys
+        lo = 0 if start is None else np.searchsorted(self.sorted_periods, start, side='left')
+        hi = len(self.order) if end is None else np.searchsorted(self.sorted_periods, end, side='right')
+        positions = self.order[lo:hi]
+        for column, values in ((self.accounts, accounts), (self.clients, clients)):
+            if values:
+                row_codes, codes = self._codes(column, values)
+                positions = positions[np.isin(row_codes[positions], codes)]
+        return positions
+
+    def sort(self, positions, column, ascending=True):
+        # Sort only the matching rows; categories sort by their labels
+        values = self.df[column].iloc[positions]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(str)
+        # A stable sort in either direction, so tied rows keep their ledger order; missing values go last
+        ranks = values.reset_index(drop=True).sort_values(ascending=ascending, kind='stable').index.to_numpy()
+        return positions[ranks]
+
+    def page(self, positions, number, size):
+        # Only the rows of the visible page are materialised
+        return self.df.iloc[positions[number * size:(number + 1) * size]]
+
+
+def transaction_index(df, key=None):
+    return cached('transaction_index', df, lambda: TransactionIndex(df), key=key)
+
+
+def iter_csv(df, positions=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Encode the selected rows chunk by chunk, so they are never copied into one frame before encoding
+    positions = np.arange(len(df)) if positions is None else positions
+    for start in range(0, max(len(positions), 1), chunk_rows):
+        chunk = df.iloc[positions[start:start + chunk_rows]]
+        yield chunk.to_csv(index=False, header=(start == 0)).encode()
+
+
+def csv_export(df, positions=None):
+    # Callable for st.download_button: the file is only built when the button is clicked. download_button
+    # needs the whole file, so the encoded chunks are collected in memory rather than streamed to the browser.
+    def build():
+        buffer = io.BytesIO()
+        for part in iter_csv(df, positions):
+            buffer.write(part)
+        buffer.seek(0)
+        return buffer
+    return build
+
+
+def page_input(container, pages, key):
+    # 1-based page selector; a page number left over from a larger result is reset to the first page
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = 1
+    return container.number_input("Page", min_value=1, max_value=pages, step=1, key=key) - 1
+
+
+def show_paginated(df, key, file_name='data.csv', index=True):
+    # Page through a frame that is already in memory (statements, filtered slices) with a full CSV export
+    col1, col2, col3 = st.columns([1, 1, 2])
+    size = col1.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_size")
+    pages = max(1, -(-len(df) // size))
+    number = page_input(col2, pages, f"{key}_page")
+    col3.caption(f"{len(df):,} rows, page {number + 1} of {pages}")
+    st.dataframe(df.iloc[number * size:(number + 1) * size], hide_index=not index)
+    st.download_button("Download CSV", csv_export(df.reset_index() if index else df), file_name=file_name,
+                       mime='text/csv', key=f"{key}_export")
+
+
+def transaction_explorer(df, key, ledger_key=None, year=None, month=None):
+    # Filter, sort and page the journal server-side; only the visible page is sent to the browser
+    index = transaction_index(df, key=ledger_key)
+    periods = index.periods()
+    if not periods:
+        st.info("No transactions.")
+        return
+    labels = [label for _, label in periods]
+    selected = f"{year}-{month:02d}" if year and month else None
+    default = labels.index(selected) if selected in labels else len(labels) - 1
+
+    if any(label not in labels for label in st.session_state.get(f"{key}_period", ())):
+        del st.session_state[f"{key}_period"]
+    col1, col2, col3 = st.columns(3)
+    start_label, end_label = col1.select_slider("Period", options=labels, value=(labels[default], labels[default]),
+                                                key=f"{key}_period")
+    accounts = col2.multiselect("Account", list(index.accounts.cat.categories), key=f"{key}_accounts")
+    clients = col3.multiselect("Supplier/client", list(index.clients.cat.categories), key=f"{key}_clients")
+    positions = index.query(periods[labels.index(start_label)][0], periods[labels.index(end_label)][0],
+                            accounts, clients)
+
+    col1, col2, col3, col4 = st.columns(4)
+    sort_by = col1.selectbox("Sort by", ['Date', 'Account', 'Supplier/client', 'Debit', 'Credit', 'Solde'],
+                             key=f"{key}_sort")
+    descending = col2.toggle("Descending", key=f"{key}_descending")
+    size = col3.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_size")
+    pages = max(1, -(-len(positions) // size))
+    number = page_input(col4, pages, f"{key}_page")
+    positions = index.sort(positions, sort_by, ascending=not descending)
+
+    st.caption(f"{len(positions):,} matching transactions, page {number + 1} of {pages}")
+    st.dataframe(index.page(positions, number, size), hide_index=True)
+    st.download_button("Download CSV", csv_export(df, positions), file_name='transactions.csv', mime='text/csv',
+                       key=f"{key}_export")
@@ -0,0 +1,86 @@
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from statements import StatementCache, ledger_fingerprint
+from instrumentation import record, stage
+
+# Plotly figure specs, shared by every page and session like the statement cache. A rerun that only moves
+# the month slider plots the same frames, so its charts are neither rebuilt nor re-validated.
+figure_cache = StatementCache(maxsize=64)
+# Builds figures the user is likely to ask for next (e.g. the neighbouring months of a scrubber)
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='figures')
+# Prefetch jobs queued or running, so reruns and fast scrubbing do not queue the same build twice
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def chart_params(params):
+    # Hashable form of plotly express keyword arguments (y=[...] lists become tuples)
+    return tuple(sorted((name, tuple(value) if isinstance(value, list) else value) for name, value in params.items()))
+
+
+@functools.lru_cache(maxsize=None)
+def spec_figure_class():
+    # Figure type that st.plotly_chart renders from a stored spec as it is. A dict would be re-validated
+    # (go.Figure(**spec)) and a live Figure deep-copied by to_dict() on every rerun; st.plotly_chart only
+    # calls to_dict() on a BaseFigure, so an instance that returns the stored spec is enough.
+    from plotly.basedatatypes import BaseFigure
+
+    class SpecFigure(BaseFigure):
+        def __init__(self, spec):
+            # BaseFigure.__init__ is skipped on purpose: it is what validates the spec
+            self.__dict__['_spec'] = spec
+
+        def to_dict(self):
+            return self._spec
+
+        def to_plotly_json(self):
+            return self._spec
+    return SpecFigure
+
+
+def frame_key(name, df, ledger_key=None):
+    # Cache key of a statement frame: the ledger version it was built from, so the frame is not hashed on
+    # every rerun; frames without a ledger version fall back to a fingerprint of their content
+    return (ledger_key, name) if ledger_key else ledger_fingerprint(df)
+
+
+def cached_figure(chart, df, build, key=None, **params):
+    # Memoise the spec of build() on (chart name, frame key, chart parameters); build() runs once per key.
+    # Specs are shared between reruns, so callers must not modify the returned figure.
+    key = key or ledger_fingerprint(df)
+
+    def timed_build():
+        with stage(f'figure:{chart}', rows=len(df)):
+            return build().to_dict()
+
+    spec, hit = figure_cache.get((chart, key, chart_params(params)), timed_build)
+    if hit:
+        record(f'figure:{chart}', rows=len(df), cached=True)
+    return spec_figure_class()(spec)
+
+
+def px_figure(kind, df, key=None, **params):
+    # px.<kind>(df, **params), built once per frame key and parameters
+    def build():
+        import plotly.express as px
+        return getattr(px, kind)(df, **params)
+    return cached_figure(kind, df, build, key=key, **params)
+
+
+def prefetch(job_key, build_figure, *args, **kwargs):
+    # Run a cached figure builder in the background so the next request for it is a cache hit.
+    # job_key names the figure; nothing is submitted while a job for it is still queued or running.
+    # A failed build is not reported here; the page raises it when it asks for the figure itself.
+    with _in_flight_lock:
+        if job_key in _in_flight:
+            return None
+        _in_flight.add(job_key)
+
+    def run():
+        try:
+            return build_figure(*args, **kwargs)
+        finally:
+            with _in_flight_lock:
+                _in_flight.discard(job_key)
+    return _prefetch_pool.submit(run)
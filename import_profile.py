@@ -0,0 +1,87 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Import-time profile of the app's modules and pages, each measured in a fresh interpreter:
+#   python import_profile.py
+#   python import_profile.py main.py app2.py statements --top 5 --output import_profile.json
+# A page script cannot be imported without running it, so a page is profiled through the
+# imports at its top level; imports deferred inside functions or branches are not counted.
+PAGES = ['main.py', 'app.py', 'app2.py', 'app3.py', 'app4.py', 'app5.py', 'app6.py', 'dashboard.py']
+MODULES = ['ingest', 'ledger_cache', 'workbook', 'statements', 'precompute', 'explorer', 'timeseries',
+           'dashboardExecutiveSummary', 'sql']
+
+
+def top_level_imports(path):
+    # Import statements executed when the script starts, as source lines
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def import_statements(target):
+    if target.endswith('.py'):
+        return top_level_imports(target)
+    return [f'import {target}']
+
+
+def profile_imports(statements):
+    # (wall milliseconds, {root package: self milliseconds}) of running the statements in a new interpreter
+    code = '\n'.join(['import time', 'start = time.perf_counter()'] + statements +
+                     ['print((time.perf_counter() - start) * 1000)'])
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    packages = defaultdict(float)
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        packages[name.strip().split('.')[0]] += int(self_us) / 1000
+    return float(result.stdout.strip().splitlines()[-1]), dict(packages)
+
+
+def profile_target(target, repeat=3, top=5):
+    # Best of `repeat` cold imports; the package breakdown is taken from the fastest run
+    statements = import_statements(target)
+    try:
+        runs = [profile_imports(statements) for _ in range(repeat)]
+    except RuntimeError as error:
+        return {'target': target, 'wall_ms': None, 'error': str(error), 'heaviest': []}
+    wall_ms, packages = min(runs, key=lambda run: run[0])
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {'target': target, 'wall_ms': round(wall_ms, 1),
+            'heaviest': [{'package': name, 'self_ms': round(ms, 1)} for name, ms in heaviest]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the import time of the app's pages and modules.")
+    parser.add_argument('targets', nargs='*', help="Page scripts (*.py) or module names (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="Cold imports per target (the best is kept)")
+    parser.add_argument('--top', type=int, default=5, help="Heaviest packages listed per target")
+    parser.add_argument('--output', help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = [profile_target(target, args.repeat, args.top) for target in args.targets or PAGES + MODULES]
+    width = max(len(result['target']) for result in results)
+    for result in sorted(results, key=lambda result: result['wall_ms'] or 0, reverse=True):
+        if result['wall_ms'] is None:
+            print(f"{result['target']:<{width}}  failed: {result['error']}")
+            continue
+        heaviest = ', '.join(f"{item['package']} {item['self_ms']:.0f}ms" for item in result['heaviest'])
+        print(f"{result['target']:<{width}}  {result['wall_ms']:>8.1f} ms  {heaviest}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from PL import preprocess_pl
+from BS import BS_ACCOUNT_LINES, add_totals, balance_sheet_lines
+from ingest import concat_ledgers
+
+
+def append_entries(ledger, profit_loss_df, balance_sheet_df, new_rows):
+    # Append cleaned journal rows (see ingest.load_ledger) to a ledger whose P&L and balance sheet are already built.
+    # Only the Year-Month buckets touched by new_rows are recomputed; ongoing earnings roll forward from the
+    # cumulative value persisted in balance_sheet_df. Returns (ledger, profit_loss_df, balance_sheet_df).
+    if len(new_rows) == 0:
+        return ledger, profit_loss_df, balance_sheet_df
+    affected = sorted(str(month) for month in new_rows['Year-Month'].unique())
+
+    # Step 1: Rows of the affected months. A new month-end close only touches months after the ledger ends,
+    # so the existing ledger is only scanned when entries are back-dated.
+    if len(ledger) == 0 or new_rows['Period'].min() > ledger['Period'].max():
+        month_rows = new_rows
+    else:
+        month_rows = concat_ledgers([ledger[ledger['Year-Month'].isin(affected)], new_rows])
+    ledger = concat_ledgers([ledger, new_rows])
+
+    # Step 2: Replace the P&L rows of the affected months
+    profit_loss = profit_loss_df.assign(**{'Year-Month': profit_loss_df['Year-Month'].astype(str)})
+    profit_loss_delta = preprocess_pl(month_rows)
+    profit_loss_delta['Year-Month'] = profit_loss_delta['Year-Month'].astype(str)
+    profit_loss = pd.concat([profit_loss[~profit_loss['Year-Month'].isin(affected)], profit_loss_delta])
+    profit_loss = profit_loss.sort_values('Year-Month').reset_index(drop=True)
+
+    # Step 3: Balance sheet lines of the affected months; later months (back-dated entries) keep their lines
+    balance_sheet = balance_sheet_df.assign(**{'Year-Month': balance_sheet_df['Year-Month'].astype(str)})
+    start = affected[0]
+    earlier = balance_sheet[balance_sheet['Year-Month'] < start]
+    later = balance_sheet[(balance_sheet['Year-Month'] >= start) & ~balance_sheet['Year-Month'].isin(affected)]
+    line_columns = ['Year-Month'] + list(BS_ACCOUNT_LINES.values())
+    rows = pd.concat([later[line_columns], balance_sheet_lines(month_rows).astype({'Year-Month': str})])
+    rows = rows.sort_values('Year-Month').reset_index(drop=True)
+
+    # Step 4: Roll ongoing earnings forward from the last persisted cumulative net income before the first affected month
+    net_income = profit_loss.set_index('Year-Month')['Net Result']
+    prior_months = net_income.index[net_income.index < start]
+    opening = 0.0
+    if len(prior_months):
+        opening = earlier.set_index('Year-Month')['ongoing earnings'].get(prior_months[-1], 0.0)
+    following = net_income[net_income.index >= start]
+    # Summed in the same order as a full cumsum, so the result matches a full rebuild exactly
+    cumulative = pd.Series(np.cumsum(np.r_[opening, following.to_numpy()])[1:], index=following.index)
+    rows['ongoing earnings'] = rows['Year-Month'].map(cumulative).fillna(0)
+    rows = add_totals(rows)
+
+    balance_sheet = pd.concat([earlier, rows], ignore_index=True)
+    # The months were compared as strings above; give the P&L back the Year-Month dtype a full rebuild has
+    profit_loss['Year-Month'] = profit_loss['Year-Month'].astype(ledger['Year-Month'].dtype)
+    return ledger, profit_loss, balance_sheet
@@ -0,0 +1,137 @@
+import pandas as pd
+from chart_of_accounts import assign_line_codes
+
+NUMERIC_COLUMNS = ['Debit', 'Credit', 'Solde']
+# Columns with few distinct values, stored as category codes instead of per-row strings
+CATEGORY_COLUMNS = ['Account', 'Supplier/client', 'Component', 'Currency']
+# Free text that is close to unique per row: a category would only add a dictionary as large as the column
+TEXT_COLUMNS = ['Description', 'Document Reference']
+# Dimensions cleaned the same way the pages used to: astype(str), stripped (and lowercased for Account)
+CLEANED_COLUMNS = ['Account', 'Supplier/client', 'Component']
+
+
+def period_key(year, month):
+    # Consecutive months get consecutive integers, so the previous month is simply period - 1
+    return year * 12 + month - 1
+
+
+def period_label(period):
+    year, month = divmod(int(period), 12)
+    return f"{year}-{month + 1:02d}"
+
+
+def clean_category(series, lower=False):
+    # Clean the distinct values once and re-encode, instead of stripping every row.
+    # Missing values become the string 'nan', like astype(str) did.
+    series = series.astype('category')
+    values = series.cat.categories.astype(str).append(pd.Index(['nan'])).str.strip()
+    if lower:
+        values = values.str.lower()
+    codes, categories = pd.factorize(values, sort=True)
+    # Category code -1 (missing) picks the trailing 'nan' entry
+    cleaned = pd.Categorical.from_codes(codes[series.cat.codes.to_numpy()], categories=categories)
+    return pd.Series(cleaned, index=series.index, name=series.name).cat.remove_unused_categories()
+
+
+def year_month(periods):
+    # 'Year-Month' labels are built once per distinct period, not concatenated per row
+    if len(periods):
+        first, last = int(periods.min()), int(periods.max())
+        labels = [period_label(period) for period in range(first, last + 1)]
+        labels = pd.Categorical.from_codes((periods - first).to_numpy(), categories=labels)
+    else:
+        labels = pd.Categorical([], categories=[])
+    return pd.Series(labels, index=periods.index).cat.remove_unused_categories()
+
+
+def clean_ledger(df):
+    # Step 1: Amounts as float64, missing amounts as 0
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('float64')
+
+    # Step 2: Dimensions as categories
+    for col in CATEGORY_COLUMNS:
+        if col in CLEANED_COLUMNS:
+            df[col] = clean_category(df[col], lower=(col == 'Account'))
+        elif col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('str')
+
+    # Step 3: Dates and period keys (rows without a date cannot be assigned to a month)
+    df['Date'] = pd.to_datetime(df['Date'])
+    if df['Date'].isna().any():
+        df = df[df['Date'].notna()].copy()
+    df['Month'] = df['Date'].dt.month.astype('int16')
+    df['Year'] = df['Date'].dt.year.astype('int16')
+    df['Period'] = period_key(df['Year'].astype('int32'), df['Month'].astype('int32'))
+
+    df['Year-Month'] = year_month(df['Period'])
+
+    # Step 4: Chart-of-accounts line codes
+    assign_line_codes(df)
+    return df
+
+
+# Rows read per chunk by the streaming ingest path
+CHUNK_ROWS = 500_000
+# Keys of the compact ledger produced by stream_ledger: enough for the P&L, balance sheet and revenue rollups
+AGGREGATE_KEYS = ['Period', 'Line Code', 'Component', 'Supplier/client']
+
+
+def read_journal(source, **kwargs):
+    # Parse the dimension columns straight into categories (and free text as strings) to keep the peak memory low
+    dtype = {col: 'category' for col in CATEGORY_COLUMNS} | {col: 'str' for col in TEXT_COLUMNS}
+    return pd.read_csv(source, dtype=dtype, **kwargs)
+
+
+def load_ledger(source):
+    return clean_ledger(read_journal(source))
+
+
+def iter_ledger_chunks(source, chunksize=CHUNK_ROWS):
+    for chunk in read_journal(source, chunksize=chunksize):
+        yield clean_ledger(chunk)
+
+
+def stream_ledger(source, chunksize=CHUNK_ROWS, transform=None):
+    # Read the journal in bounded chunks and fold each one into running (period, line, component, client)
+    # totals. Peak memory is one chunk plus the totals, not the whole file. The result is a compact ledger
+    # with the same columns the statement builders group on, so PL, BS and KPI accept it unchanged.
+    # transform, if given, is applied to each cleaned chunk before it is folded in (see consolidation.py).
+    totals = None
+    for chunk in iter_ledger_chunks(source, chunksize):
+        if transform is not None:
+            chunk = transform(chunk)
+        part = chunk.groupby(AGGREGATE_KEYS, observed=True)[NUMERIC_COLUMNS].sum().reset_index()
+        part = part.astype({'Component': str, 'Supplier/client': str})
+        if totals is not None:
+            part = pd.concat([totals, part]).groupby(AGGREGATE_KEYS)[NUMERIC_COLUMNS].sum().reset_index()
+        totals = part
+    if totals is None:
+        totals = pd.DataFrame(columns=AGGREGATE_KEYS + NUMERIC_COLUMNS)
+    return compact_ledger(totals)
+
+
+def compact_ledger(totals):
+    totals = totals.astype({'Period': 'int32', 'Line Code': 'int16', 'Component': 'category',
+                            'Supplier/client': 'category'})
+    totals = totals.astype({col: 'float64' for col in NUMERIC_COLUMNS})
+    totals['Year'] = (totals['Period'] // 12).astype('int16')
+    totals['Month'] = (totals['Period'] % 12 + 1).astype('int16')
+    totals['Year-Month'] = year_month(totals['Period'])
+    return totals
+
+
+def concat_ledgers(ledgers):
+    # pd.concat turns categories into plain objects when the category sets differ, so unify them first
+    non_empty = [ledger for ledger in ledgers if len(ledger)]
+    if len(non_empty) <= 1:
+        return non_empty[0] if non_empty else ledgers[0]
+    ledgers = non_empty
+    for col in CATEGORY_COLUMNS + ['Year-Month']:
+        if all(col in ledger.columns for ledger in ledgers):
+            categories = pd.api.types.union_categoricals([ledger[col].astype('category') for ledger in ledgers], sort_categories=True).categories
+            ledgers = [ledger.assign(**{col: ledger[col].astype(pd.CategoricalDtype(categories))}) for ledger in ledgers]
+    return pd.concat(ledgers, ignore_index=True)
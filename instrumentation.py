@@ -0,0 +1,100 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Developer-only profiling of the pipeline stages, off by default:
+#   AIFINA_PROFILE=1 streamlit run main.py                       -> breakdown panel in the sidebar
+#   AIFINA_PROFILE_LOG=profile.jsonl streamlit run main.py       -> one JSON line per rerun
+# Peak memory comes from tracemalloc, which is process-wide: with several sessions running at once
+# their allocations overlap.
+PROFILE = os.environ.get('AIFINA_PROFILE') == '1'
+PROFILE_LOG = os.environ.get('AIFINA_PROFILE_LOG')
+ENABLED = PROFILE or bool(PROFILE_LOG)
+
+# Each Streamlit rerun runs on one thread, so the records of a rerun are kept per thread
+_local = threading.local()
+
+
+def start_run():
+    _local.records = []
+    _local.stack = []
+    if ENABLED and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def record(name, **fields):
+    if ENABLED and getattr(_local, 'records', None) is not None:
+        _local.records.append({'stage': name, 'depth': len(_local.stack), **fields})
+
+
+@contextmanager
+def stage(name, rows=None):
+    # Records wall time, row count and peak traced memory of the block; a no-op unless profiling is on
+    if not ENABLED or getattr(_local, 'records', None) is None:
+        yield {}
+        return
+    entry = {'stage': name, 'depth': len(_local.stack), 'rows': rows, 'max_peak': 0}
+    if _local.stack:
+        # Nested stages reset the peak counter, so keep what the enclosing stage had reached so far
+        parent = _local.stack[-1]
+        parent['max_peak'] = max(parent['max_peak'], tracemalloc.get_traced_memory()[1])
+    start_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    _local.stack.append(entry)
+    _local.records.append(entry)
+    start = time.perf_counter()
+    try:
+        yield entry
+    finally:
+        entry['seconds'] = time.perf_counter() - start
+        peak = max(tracemalloc.get_traced_memory()[1], entry.pop('max_peak'))
+        entry['peak_mb'] = (peak - start_memory) / 2**20
+        _local.stack.pop()
+        if _local.stack:
+            _local.stack[-1]['max_peak'] = max(_local.stack[-1]['max_peak'], peak)
+
+
+def instrumented(name):
+    # Decorator form of stage(); rows is the length of the first DataFrame argument
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            import pandas as pd
+            frames = [arg for arg in args if isinstance(arg, pd.DataFrame)]
+            with stage(name, rows=len(frames[0]) if frames else None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def finish_run(page=None):
+    # Returns the records of the rerun, appending them to the JSON log when one is configured
+    records = getattr(_local, 'records', None) or []
+    _local.records = None
+    if PROFILE_LOG and records:
+        with open(PROFILE_LOG, 'a') as f:
+            f.write(json.dumps({'timestamp': datetime.now(timezone.utc).isoformat(), 'page': page,
+                                'stages': records}) + '\n')
+    return records
+
+
+def show_profile_panel(records):
+    # Sidebar breakdown of the rerun, shown only when AIFINA_PROFILE=1
+    if not PROFILE:
+        return
+    import pandas as pd
+    import streamlit as st
+    with st.sidebar.expander("⏱ Stage timings", expanded=False):
+        if not records:
+            st.caption("No stages recorded on this rerun.")
+            return
+        table = pd.DataFrame(records)
+        table['stage'] = ['  ' * depth + name for depth, name in zip(table['depth'], table['stage'])]
+        st.dataframe(table.drop(columns=['depth']), hide_index=True)
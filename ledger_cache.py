@@ -0,0 +1,96 @@
+import hashlib
+import io
+import os
+import tempfile
+import pandas as pd
+from chart_of_accounts import assign_line_codes
+from ingest import CATEGORY_COLUMNS, load_ledger
+from workbook import is_workbook, load_workbook_ledger
+
+# Cleaned ledgers are stored as Parquet files named after the hash of the uploaded bytes
+CACHE_DIR = '.cache/ledger'
+# Part of every cache file name: bump it whenever clean_ledger, CATEGORY_COLUMNS or the line-code
+# mapping change what a cleaned ledger looks like, so files written by older code are no longer served
+LEDGER_SCHEMA_VERSION = 2
+# Least recently used files are evicted once the cache grows past this size
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_path(key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f'{key}-v{LEDGER_SCHEMA_VERSION}.parquet')
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, keep=None):
+    # Drop the least recently used files until the cache fits; the file just written is always kept
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.parquet'):
+            path = os.path.join(cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Another session evicted it in the meantime
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def parse_ledger(data):
+    # Cleaned ledger of an uploaded journal, CSV or Excel workbook
+    if is_workbook(data):
+        return load_workbook_ledger(data)
+    return load_ledger(io.BytesIO(data))
+
+
+def cached_ledger(data, key=None, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    # Return the cleaned ledger for the raw journal bytes (CSV or XLSX), parsing them only on a cache miss
+    key = key or content_hash(data)
+    path = cache_path(key, cache_dir)
+    try:
+        # Touch the file so eviction sees it as recently used
+        os.utime(path)
+        df = pd.read_parquet(path, memory_map=True)
+    except FileNotFoundError:
+        # Not cached yet, or evicted by another session since
+        pass
+    else:
+        # Parquet drops the category dtype of columns that are entirely empty
+        for col in CATEGORY_COLUMNS:
+            if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+        # Line codes are re-derived (once per distinct account) so chart-of-accounts edits apply to cached ledgers
+        return assign_line_codes(df)
+
+    df = parse_ledger(data)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary file first so a concurrent reader never sees a partial Parquet file.
+    # Sessions are threads of one process, so every writer gets its own uniquely named file.
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+    os.close(fd)
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    evict(cache_dir, max_bytes, keep=path)
+    return df
+
+
+def cached_ledger_file(path, **kwargs):
+    with open(path, 'rb') as f:
+        return cached_ledger(f.read(), **kwargs)
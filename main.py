@@ -1,9 +1,12 @@
 import streamlit as st
 from st_pages import add_page_title, get_nav_from_toml
-import pandas as pd
+from instrumentation import finish_run, show_profile_panel, stage, start_run
 
 st.set_page_config(layout="wide", page_title="AIFINA Financial Dashboard")
 
+# Per-stage timings of this rerun (developer-only, see instrumentation.py)
+start_run()
+
 # Initialize session state
 if 'data' not in st.session_state:
     st.session_state.data = None
@@ -13,35 +16,55 @@ if 'selected_year' not in st.session_state:
     st.session_state.selected_year = None
 
 # File uploader
-uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
+uploaded_file = st.file_uploader("Choose a CSV or Excel file", type=["csv", "xlsx"])
 
 if uploaded_file is not None:
-    # Read the CSV file
-    df = pd.read_csv(uploaded_file)
-    # Step 2: Data Cleaning
-    numeric_cols = ['Debit', 'Credit', 'Solde']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-    string_cols = ['Account', 'Supplier/client', 'Component']
-    for col in string_cols:
-        df[col] = df[col].astype(str).str.strip()
-
-    # Convert 'Date' to datetime
-    df['Date'] = pd.to_datetime(df['Date'])
-
-    # Extract Month and Year if not already present
-    df['Month'] = df['Date'].dt.month
-    df['Year'] = df['Date'].dt.year
-
-    # Add 'Year-Month' column for easier grouping
-    df['Year-Month'] = df['Year'].astype(str) + '-' + df['Month'].astype(str).str.zfill(2)
-
-    # Lowercase account column for consistency
-    df['Account'] = df['Account'].str.lower()
-
-
-    st.session_state.data = df
+    # The ledger and statement modules pull in pandas; they are imported once a file is there,
+    # so the upload form paints without waiting for them (see import_profile.py)
+    from ledger_cache import cached_ledger, content_hash, parse_ledger
+    from incremental import append_entries
+    from statements import balance_sheet, profit_and_loss, store
+    from precompute import start_precompute
+
+    # Read and clean the CSV or Excel file into the typed, categorical ledger, only when a different file is uploaded.
+    # Re-uploading the same file reads the cleaned ledger back from the on-disk cache instead.
+    data = uploaded_file.getvalue()
+    upload_key = content_hash(data)
+    if st.session_state.get('upload_key') != upload_key:
+        st.session_state.upload_key = upload_key
+        st.session_state.ledger_key = upload_key
+        with stage('ingest') as ingest_stage:
+            st.session_state.data = cached_ledger(data, key=upload_key)
+            ingest_stage['rows'] = len(st.session_state.data)
+        st.session_state.appended_keys = set()
+
+    # Append new journal entries without rebuilding the statements of untouched months.
+    # The uploader is keyed on the base file, so a new base upload starts with an empty one.
+    appended_file = st.sidebar.file_uploader("Append journal entries", type=["csv", "xlsx"],
+                                             key=f"append_{upload_key}")
+    if appended_file is not None:
+        appended_data = appended_file.getvalue()
+        appended_key = content_hash(appended_data)
+        if appended_key not in st.session_state.appended_keys:
+            ledger_key = st.session_state.ledger_key
+            df = st.session_state.data
+            with stage('append_entries') as append_stage:
+                new_rows = parse_ledger(appended_data)
+                append_stage['rows'] = len(new_rows)
+                df, profit_loss_df, balance_sheet_df = append_entries(
+                    df, profit_and_loss(df, key=ledger_key), balance_sheet(df, key=ledger_key), new_rows
+                )
+            ledger_key = content_hash(f"{ledger_key}+{appended_key}".encode())
+            store('profit_loss', ledger_key, profit_loss_df)
+            store('balance_sheet', ledger_key, balance_sheet_df)
+            st.session_state.ledger_key = ledger_key
+            st.session_state.data = df
+            st.session_state.appended_keys.add(appended_key)
+
+    # Build the statements in the background while the user picks a page
+    start_precompute(st.session_state.data, st.session_state.ledger_key)
+
+    df = st.session_state.data
     
     st.sidebar.header("Filter Options")
 
@@ -71,4 +94,6 @@ pg = st.navigation(nav)
 
 add_page_title(pg)
 
-pg.run()
\ No newline at end of file
+pg.run()
+
+show_profile_panel(finish_run(page=pg.title))
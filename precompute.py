@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from statements import balance_sheet, kpis, period_cube, profit_and_loss, working_capital
+
+# Statements built in the background as soon as a ledger is uploaded, in dependency order.
+# Each job stores its result in the statement cache, so pages read them back as cache hits.
+JOBS = OrderedDict([
+    ('profit_loss', (profit_and_loss, [])),
+    ('balance_sheet', (balance_sheet, ['profit_loss'])),
+    ('kpi', (kpis, ['profit_loss', 'balance_sheet'])),
+    ('working_capital', (working_capital, ['profit_loss', 'balance_sheet'])),
+    ('period_cube', (period_cube, [])),
+])
+# Threads share the ledger and the statement cache with the Streamlit sessions, nothing is copied
+WORKERS = 4
+# Ledger versions whose futures are kept around
+MAX_LEDGERS = 8
+
+_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='precompute')
+_futures = OrderedDict()
+_lock = threading.Lock()
+
+
+def start_precompute(df, key):
+    # Submit every job for this ledger version once; later calls with the same key are no-ops
+    with _lock:
+        if key in _futures:
+            _futures.move_to_end(key)
+            return _futures[key]
+        futures = {}
+        for name, (build, dependencies) in JOBS.items():
+            # Dependencies are always submitted earlier, so a waiting job never blocks the pool for good
+            waits = [futures[dependency] for dependency in dependencies]
+            futures[name] = _pool.submit(run_job, build, df, key, waits)
+        _futures[key] = futures
+        while len(_futures) > MAX_LEDGERS:
+            _futures.popitem(last=False)
+        return futures
+
+
+def run_job(build, df, key, waits):
+    for future in waits:
+        future.result()
+    return build(df, key=key)
+
+
+def progress(key):
+    # (finished jobs, total jobs) for a ledger version; (0, 0) when nothing was started for it
+    with _lock:
+        futures = _futures.get(key, {})
+    return sum(future.done() for future in futures.values()), len(futures)
+
+
+def wait_for_statements(key, names=None, poll=0.1):
+    # Block the page on the background jobs it needs, with a progress bar while any is pending.
+    # A failed job re-raises its error here, on the page that asked for it.
+    with _lock:
+        futures = _futures.get(key, {})
+    futures = [future for name, future in futures.items() if names is None or name in names]
+    if not futures:
+        return
+    pending = [future for future in futures if not future.done()]
+    if pending:
+        bar = st.progress(0.0, text="Preparing statements...")
+        while pending:
+            done = len(futures) - len(pending)
+            bar.progress(done / len(futures), text=f"Preparing statements... {done} of {len(futures)} ready")
+            time.sleep(poll)
+            pending = [future for future in pending if not future.done()]
+        bar.empty()
+    for future in futures:
+        future.result()
@@ -1,43 +1,23 @@
 import pandas as pd
 import numpy as np
+from chart_of_accounts import line_code, line_codes
+from ingest import stream_ledger
 
 def preprocess_pl(input_file, output_file, account_filters):
-    # Step 1: Load the Data
-    df = pd.read_csv(input_file)
-
-    # Step 2: Data Cleaning
-    numeric_cols = ['Debit', 'Credit', 'Solde']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-    string_cols = ['Account', 'Supplier/client', 'Component']
-    for col in string_cols:
-        df[col] = df[col].astype(str).str.strip()
-
-    # Convert 'Date' to datetime
-    df['Date'] = pd.to_datetime(df['Date'])
-
-    # Extract Month and Year if not already present
-    df['Month'] = df['Date'].dt.month
-    df['Year'] = df['Date'].dt.year
-
-    # Add 'Year-Month' column for easier grouping
-    df['Year-Month'] = df['Year'].astype(str) + '-' + df['Month'].astype(str).str.zfill(2)
-
-    # Lowercase account column for consistency
-    df['Account'] = df['Account'].str.lower()
+    # Step 1: Stream the Data in bounded chunks into per-(month, line) totals with chart-of-accounts line codes
+    df = stream_ledger(input_file)
 
     # Step 3: Filter based on account selection from the dashboard
-    filtered_df = df[df['Account'].isin(account_filters)]
+    filtered_df = df[df['Line Code'].isin(line_codes(account_filters))]
 
     # Step 4: Define KPI Calculation Functions
     def calculate_sales_revenue(df):
-        sales = df[df['Account'] == 'sales revenue'].groupby('Year-Month')['Solde'].sum().reset_index()
+        sales = df[df['Line Code'] == line_code('sales revenue')].groupby('Year-Month', observed=True)['Solde'].sum().reset_index()
         sales['Sales Revenue'] = -sales['Solde']
         return sales[['Year-Month', 'Sales Revenue']]
 
     def calculate_cogs(df):
-        cogs = df[df['Account'] == 'cost of goods sold'].groupby('Year-Month')['Solde'].sum().reset_index()
+        cogs = df[df['Line Code'] == line_code('cost of goods sold')].groupby('Year-Month', observed=True)['Solde'].sum().reset_index()
         cogs.rename(columns={'Solde': 'Cost of Goods Sold'}, inplace=True)
         return cogs[['Year-Month', 'Cost of Goods Sold']]
 
@@ -48,13 +28,13 @@ def preprocess_pl(input_file, output_file, account_filters):
         return gm[['Year-Month', 'Gross Margin', 'Gross Margin (%)']]
 
     def calculate_operating_expenses(df):
-        personnel = df[df['Account'] == 'personnel'].groupby('Year-Month')['Solde'].sum().reset_index()
+        personnel = df[df['Line Code'] == line_code('personnel')].groupby('Year-Month', observed=True)['Solde'].sum().reset_index()
         personnel.rename(columns={'Solde': 'Personnel'}, inplace=True)
         
-        facility = df[df['Account'] == 'facility'].groupby('Year-Month')['Solde'].sum().reset_index()
+        facility = df[df['Line Code'] == line_code('facility')].groupby('Year-Month', observed=True)['Solde'].sum().reset_index()
         facility.rename(columns={'Solde': 'Facility'}, inplace=True)
         
-        administration = df[df['Account'] == 'administration'].groupby('Year-Month')['Solde'].sum().reset_index()
+        administration = df[df['Line Code'] == line_code('administration')].groupby('Year-Month', observed=True)['Solde'].sum().reset_index()
         administration.rename(columns={'Solde': 'Administration'}, inplace=True)
         
         operating_exp = pd.merge(personnel, facility, on='Year-Month', how='outer')
@@ -68,11 +48,11 @@ def preprocess_pl(input_file, output_file, account_filters):
         return ebitda[['Year-Month', 'EBITDA']]
 
     def calculate_financials(df):
-        fin_income = df[df['Account'] == 'financial income'].groupby('Year-Month')['Solde'].sum().reset_index()
+        fin_income = df[df['Line Code'] == line_code('financial income')].groupby('Year-Month', observed=True)['Solde'].sum().reset_index()
         fin_income['Solde'] = -fin_income['Solde']
         fin_income.rename(columns={'Solde': 'Financial Income'}, inplace=True)
         
-        fin_cost = df[df['Account'] == 'financial cost'].groupby('Year-Month')['Solde'].sum().reset_index()
+        fin_cost = df[df['Line Code'] == line_code('financial cost')].groupby('Year-Month', observed=True)['Solde'].sum().reset_index()
         fin_cost.rename(columns={'Solde': 'Financial Cost'}, inplace=True)
         
         financials = pd.merge(fin_income, fin_cost, on='Year-Month', how='outer').fillna(0)
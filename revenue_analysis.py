@@ -3,6 +3,8 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from calculations import financial_dashboard
+from chart_of_accounts import line_code
+from ledger_cache import cached_ledger_file
 
 def revenue_analysis_page():
     st.title("Revenue Analysis")
@@ -10,9 +12,7 @@ def revenue_analysis_page():
     # Load data
     @st.cache_data
     def load_data():
-        df = pd.read_csv('data/journalEntry.csv')
-        df['Date'] = pd.to_datetime(df['Date'])
-        return df
+        return cached_ledger_file('data/journalEntry.csv')
 
     df = load_data()
 
@@ -22,7 +22,7 @@ def revenue_analysis_page():
     selected_year = st.sidebar.selectbox("Select Year", df['Year'].unique())
 
     # Filter data
-    filtered_df = df[(df['Month'] == selected_month) & (df['Year'] == selected_year) & (df['Account'] == 'Sales Revenue')]
+    filtered_df = df[(df['Month'] == selected_month) & (df['Year'] == selected_year) & (df['Line Code'] == line_code('sales revenue'))]
 
     # Calculate total revenue
     total_revenue = -filtered_df['Solde'].sum() / 1000  # Convert to K$
@@ -30,7 +30,7 @@ def revenue_analysis_page():
     st.metric("Total Revenue", f"${total_revenue:,.2f}K")
 
     # Revenue by client
-    revenue_by_client = filtered_df.groupby('Supplier/client')['Solde'].sum().sort_values(ascending=False)
+    revenue_by_client = filtered_df.groupby('Supplier/client', observed=True)['Solde'].sum().sort_values(ascending=False)
     revenue_by_client = -revenue_by_client / 1000  # Convert to K$ and make positive
 
     # Bar chart of revenue by client
@@ -55,7 +55,7 @@ def revenue_analysis_page():
 
     # Revenue evolution (if data available)
     st.subheader("Revenue Evolution")
-    monthly_revenue = df[df['Account'] == 'Sales Revenue'].groupby(['Year', 'Month'])['Solde'].sum().reset_index()
+    monthly_revenue = df[df['Line Code'] == line_code('sales revenue')].groupby(['Year', 'Month'])['Solde'].sum().reset_index()
     monthly_revenue['Revenue'] = -monthly_revenue['Solde'] / 1000  # Convert to K$ and make positive
     fig_line = px.line(monthly_revenue, x='Month', y='Revenue', color='Year',
                        title="Monthly Revenue Evolution",
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from ingest import period_key, period_label
+
+# Flow lines of the P&L that add up over time; the margin ratio is recomputed from the summed lines
+FLOW_LINES = ['Sales Revenue', 'Cost of Goods Sold', 'Gross Margin', 'Personnel', 'Facility', 'Administration',
+              'EBITDA', 'Financial Income', 'Financial Cost', 'Net Result']
+
+
+class RollingPL:
+    # Prefix sums of the monthly P&L over a gap-free month axis: the sum of any window is the difference
+    # of two rows, so LTM / YTD / QTD of every month cost O(1) each once the prefix is built in O(n)
+    def __init__(self, profit_loss_df):
+        periods = period_key(profit_loss_df['Year'].to_numpy().astype('int64'),
+                             profit_loss_df['Month'].to_numpy().astype('int64'))
+        self.first = int(periods.min()) if len(periods) else 0
+        n_periods = int(periods.max()) - self.first + 1 if len(periods) else 0
+        # Months without postings count as zero
+        values = np.zeros((n_periods, len(FLOW_LINES)))
+        values[periods - self.first] = profit_loss_df[FLOW_LINES].to_numpy(dtype='float64')
+        self.prefix = np.vstack([np.zeros((1, len(FLOW_LINES))), np.cumsum(values, axis=0)])
+        self.periods = np.arange(self.first, self.first + n_periods)
+        self.labels = [period_label(period) for period in self.periods]
+
+    def _frame(self, starts, ends):
+        # Sums of the rows [start, end) of the month axis, one output row per window
+        sums = pd.DataFrame(self.prefix[ends] - self.prefix[starts], columns=FLOW_LINES)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            margin = sums['Gross Margin'] / sums['Sales Revenue'] * 100
+        sums.insert(FLOW_LINES.index('Gross Margin') + 1, 'Gross Margin (%)', margin.where(sums['Sales Revenue'] != 0, 0))
+        sums['Months'] = ends - starts
+        return sums
+
+    def _bounds(self, kind, months, rows):
+        # [start, end) of the window ending at each of `rows` (indices on the month axis)
+        ends = rows + 1
+        if kind == 'window':
+            starts = ends - months
+        elif kind == 'ytd':
+            starts = rows - self.periods[rows] % 12
+        else:
+            starts = rows - self.periods[rows] % 3
+        # Windows reaching before the first ledger month are truncated (see the Months column)
+        return np.maximum(starts, 0), ends
+
+    def series(self, kind='window', months=12):
+        # Rolling figures for every month at once: kind is 'window' (trailing `months`), 'ytd' or 'qtd'
+        frame = self._frame(*self._bounds(kind, months, np.arange(len(self.periods))))
+        frame.insert(0, 'Year-Month', self.labels)
+        return frame
+
+    def as_of(self, year, month, months=12):
+        # Month, QTD, YTD and trailing-window figures of one month, one column each
+        row = period_key(year, month) - self.first
+        if row < 0 or row >= len(self.periods):
+            return None
+        columns = {}
+        for name, kind, window in (('Month', 'window', 1), ('QTD', 'qtd', 1), ('YTD', 'ytd', 1),
+                                   ('LTM' if months == 12 else f'Last {months} months', 'window', months)):
+            columns[name] = self._frame(*self._bounds(kind, window, np.array([row]))).iloc[0]
+        return pd.DataFrame(columns)
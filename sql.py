@@ -0,0 +1,74 @@
+import re
+import duckdb
+import pandas as pd
+from statements import balance_sheet, kpis, ledger_fingerprint, profit_and_loss, working_capital
+
+# Ad-hoc SQL over the ledger and the statements built from it:
+#   from sql import query
+#   query(df, 'SELECT "Supplier/client", SUM(Credit - Debit) AS revenue FROM ledger GROUP BY 1', key=ledger_key)
+# DuckDB scans the registered frames where they are (numpy and Arrow buffers are read without a copy) and
+# runs the query column by column on every core, so aggregations over the whole ledger stay interactive.
+TABLES = {
+    'ledger': lambda df, key: df,
+    'profit_loss': lambda df, key: profit_and_loss(df, key=key),
+    'balance_sheet': lambda df, key: balance_sheet(df, key=key),
+    'kpi': lambda df, key: kpis(df, key=key)[0],
+    'revenue_per_product': lambda df, key: kpis(df, key=key)[1],
+    'top_clients': lambda df, key: kpis(df, key=key)[2],
+    'working_capital': lambda df, key: working_capital(df, key=key),
+}
+EXAMPLES = {
+    'Revenue by client and month': '''SELECT "Year-Month", "Supplier/client", SUM(Credit - Debit) AS Revenue
+FROM ledger
+WHERE Account = 'sales revenue'
+GROUP BY ALL
+ORDER BY "Year-Month", Revenue DESC''',
+    'Revenue by component': '''SELECT Component, SUM(Credit - Debit) AS Revenue
+FROM ledger
+WHERE Account = 'sales revenue'
+GROUP BY ALL
+ORDER BY Revenue DESC''',
+    'Account movements by month': '''SELECT Account, "Year-Month", SUM(Debit) AS Debit, SUM(Credit) AS Credit
+FROM ledger
+GROUP BY ALL
+ORDER BY Account, "Year-Month"''',
+    'Monthly P&L with KPIs': '''SELECT p."Year-Month", p."Sales Revenue", p.EBITDA, k.*
+FROM profit_loss p JOIN kpi k USING ("Year-Month")
+ORDER BY p."Year-Month"''',
+}
+
+
+def referenced_tables(sql):
+    # Tables named in the query; only these are built and registered
+    words = {word.lower() for word in re.findall(r'[A-Za-z_][A-Za-z0-9_]*', sql)}
+    return [name for name in TABLES if name in words]
+
+
+def connect(df, key=None, tables=None):
+    # In-memory DuckDB connection with the ledger and its statements registered as views.
+    # File access is disabled so queries typed on the page can only see these frames.
+    key = key or ledger_fingerprint(df)
+    con = duckdb.connect(config={'enable_external_access': False})
+    for name in TABLES if tables is None else tables:
+        con.register(name, TABLES[name](df, key))
+    return con
+
+
+def query(df, sql, key=None):
+    # Result of the query as a DataFrame; a statement that returns no rows gives an empty frame.
+    # Every call gets its own connection, so sessions can query concurrently.
+    con = connect(df, key, referenced_tables(sql))
+    try:
+        relation = con.sql(sql)
+        return relation.df() if relation is not None else pd.DataFrame()
+    finally:
+        con.close()
+
+
+def table_columns(df, key=None):
+    # {table: [(column, SQL type), ...]} for the schema browser
+    con = connect(df, key)
+    try:
+        return {name: [row[:2] for row in con.sql(f'DESCRIBE "{name}"').fetchall()] for name in TABLES}
+    finally:
+        con.close()
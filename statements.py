@@ -0,0 +1,123 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+from PL import preprocess_pl
+from BS import preprocess_bs
+from KPI import preprocess_kpi, working_capital_kpis
+from cube import PeriodCube
+from budget import budget_variance
+from rolling import RollingPL
+from instrumentation import record, stage
+
+
+class StatementCache:
+    # Least-recently-used cache of derived frames, shared by every page and session of the app
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        # Returns (value, hit); the flag is this lookup's own, unlike the counters other sessions also move
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key], True
+            self.misses += 1
+        # Build outside the lock so one slow statement does not block other sessions
+        value = compute()
+        self.put(key, value)
+        return value, False
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+statement_cache = StatementCache()
+
+
+def ledger_fingerprint(df):
+    # Fallback when the caller has no content hash of the upload (see ledger_cache.content_hash)
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy()).hexdigest()
+
+
+def cached(name, df, compute, key=None, **params):
+    # Memoise compute() on (statement name, ledger fingerprint, parameters).
+    # Cached frames are shared between reruns, so callers must not modify them in place.
+    key = key or ledger_fingerprint(df)
+
+    def timed_compute():
+        with stage(name, rows=len(df)):
+            return compute()
+
+    value, hit = statement_cache.get((name, key, tuple(sorted(params.items()))), timed_compute)
+    if hit:
+        record(name, rows=len(df), cached=True)
+    return value
+
+
+def store(name, key, value, **params):
+    # Seed the cache with a frame built elsewhere (e.g. by incremental.append_entries)
+    statement_cache.put((name, key, tuple(sorted(params.items()))), value)
+
+
+def profit_and_loss(df, key=None):
+    key = key or ledger_fingerprint(df)
+    return cached('profit_loss', df, lambda: preprocess_pl(df), key=key)
+
+
+def balance_sheet(df, key=None):
+    key = key or ledger_fingerprint(df)
+    return cached('balance_sheet', df, lambda: preprocess_bs(df, profit_and_loss(df, key=key)), key=key)
+
+
+def kpis(df, key=None):
+    # Returns (kpi_df, revenue_per_product_df, top_clients_by_revenue_df)
+    key = key or ledger_fingerprint(df)
+    return cached('kpi', df, lambda: preprocess_kpi(profit_and_loss(df, key=key), balance_sheet(df, key=key), df), key=key)
+
+
+def working_capital(df, key=None):
+    # DSO / DIO / DPO / CCC / quick ratio per month
+    key = key or ledger_fingerprint(df)
+    return cached('working_capital', df,
+                  lambda: working_capital_kpis(profit_and_loss(df, key=key), balance_sheet(df, key=key)), key=key)
+
+
+def period_cube(df, key=None):
+    # (period x line) totals for O(1) month, previous-month and YTD lookups
+    return cached('period_cube', df, lambda: PeriodCube(df), key=key)
+
+
+def rolling_pl(profit_loss_df, key=None):
+    # Prefix sums for LTM / YTD / QTD windows; the monthly P&L is small enough to fingerprint directly
+    return cached('rolling_pl', profit_loss_df, lambda: RollingPL(profit_loss_df), key=key)
+
+
+def variance_table(df, budget_df, key=None):
+    # Budget vs actual for every month and line; rebuilt when the ledger or the budget changes
+    key = key or ledger_fingerprint(df)
+    return cached('budget_variance', df, lambda: budget_variance(profit_and_loss(df, key=key), budget_df), key=key,
+                  budget=ledger_fingerprint(budget_df))
+
+
+def cache_stats():
+    return statement_cache.stats()
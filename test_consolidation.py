@@ -0,0 +1,26 @@
+import pandas as pd
+from consolidation import eliminate_intercompany
+
+
+def ledger(counterparties, accounts=None):
+    return pd.DataFrame({'Supplier/client': counterparties,
+                         'Account': accounts or ['sales revenue'] * len(counterparties),
+                         'Solde': [1.0] * len(counterparties)})
+
+
+def test_rows_with_other_member_entities_are_eliminated():
+    chunk = ledger(['Acme Ltd', 'Client A', 'Acme GmbH'])
+    kept = eliminate_intercompany(chunk, ['Acme Ltd', 'Acme GmbH'], entity='Acme GmbH')
+    assert kept['Supplier/client'].tolist() == ['Client A', 'Acme GmbH']
+
+
+def test_self_referencing_rows_are_kept():
+    chunk = ledger(['Acme Ltd', ' Acme Ltd ', 'Client A'])
+    kept = eliminate_intercompany(chunk, ['Acme Ltd', 'Acme GmbH'], entity='Acme Ltd')
+    assert kept['Supplier/client'].tolist() == ['Acme Ltd', ' Acme Ltd ', 'Client A']
+
+
+def test_intercompany_accounts_are_eliminated_whatever_the_counterparty():
+    chunk = ledger(['Acme Ltd', 'Client A'], ['intercompany loan', 'sales revenue'])
+    kept = eliminate_intercompany(chunk, ['Acme Ltd'], ['Intercompany Loan'], entity='Acme Ltd')
+    assert kept['Supplier/client'].tolist() == ['Client A']
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from statements import cached
+
+# Points per account sent to the browser, whatever the size of the ledger
+MAX_POINTS = 400
+# Granularities offered by the charts, finest first, with their approximate length in days
+FREQUENCIES = {'Day': ('D', 1), 'Week': ('W', 7), 'Month': ('M', 30.44), 'Quarter': ('Q', 91.31), 'Year': ('Y', 365.25)}
+
+
+def choose_frequency(start, end, max_points=MAX_POINTS):
+    # Finest granularity that keeps every series of the date range under max_points
+    days = (end - start).days + 1
+    for name, (_, length) in FREQUENCIES.items():
+        if days / length <= max_points:
+            return name
+    return 'Year'
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the visual shape of (x, y)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype('float64')
+    bucket = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * bucket) + 1, int((i + 1) * bucket) + 1
+        # The next bucket's average is the third vertex; the last bucket looks ahead to the final point
+        next_end = max(min(int((i + 2) * bucket) + 1, n), end + 1)
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def resample_accounts(df, accounts, granularity='Auto', max_points=MAX_POINTS):
+    # Absolute Solde per (period start, account) at the requested granularity, at most max_points per account.
+    # Returns (frame with Date/Account/Solde, granularity used).
+    rows = df.loc[df['Account'].isin(accounts), ['Date', 'Account', 'Solde']]
+    if rows.empty:
+        return pd.DataFrame({'Date': pd.Series(dtype='datetime64[ns]'), 'Account': pd.Series(dtype=str),
+                             'Solde': pd.Series(dtype='float64')}), granularity
+    if granularity == 'Auto':
+        granularity = choose_frequency(rows['Date'].min(), rows['Date'].max(), max_points)
+    buckets = rows['Date'].dt.to_period(FREQUENCIES[granularity][0]).dt.start_time.rename('Date')
+    series = rows.groupby([buckets, rows['Account']], observed=True)['Solde'].sum().abs().reset_index()
+    series['Account'] = series['Account'].astype(str)
+
+    # A fixed granularity over a long range can still exceed the budget: thin each account with LTTB
+    counts = series['Account'].value_counts()
+    if (counts > max_points).any():
+        parts = []
+        for _, part in series.groupby('Account', sort=False):
+            keep = lttb(part['Date'].to_numpy().astype('int64'), part['Solde'].to_numpy(), max_points)
+            parts.append(part.iloc[keep])
+        series = pd.concat(parts, ignore_index=True)
+    return series, granularity
+
+
+def account_series(df, accounts, granularity='Auto', key=None, max_points=MAX_POINTS):
+    # Cached per ledger version, account selection and granularity, so reruns do not regroup the ledger
+    accounts = tuple(sorted(set(accounts)))
+    return cached('account_series', df, lambda: resample_accounts(df, list(accounts), granularity, max_points),
+                  key=key, accounts=accounts, granularity=granularity, max_points=max_points)
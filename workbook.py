@@ -0,0 +1,88 @@
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from ingest import clean_ledger
+
+# A sheet holds journal entries when its header row has at least these columns
+JOURNAL_HEADER = ['Date', 'Account', 'Debit', 'Credit', 'Solde']
+# Excel files are zip archives
+XLSX_MAGIC = b'PK\x03\x04'
+
+
+def is_workbook(data):
+    return data[:4] == XLSX_MAGIC
+
+
+def open_workbook(data):
+    # Read-only mode streams rows from the sheet XML instead of building every cell object.
+    # openpyxl is imported here so CSV uploads never pay for it.
+    from openpyxl import load_workbook
+    return load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+
+
+def journal_sheets(data):
+    # Names of the sheets whose first row is a journal header
+    workbook = open_workbook(data)
+    try:
+        names = []
+        for sheet in workbook.worksheets:
+            header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+            header = {str(value).strip() for value in header if value is not None}
+            if all(column in header for column in JOURNAL_HEADER):
+                names.append(sheet.title)
+        return names
+    finally:
+        workbook.close()
+
+
+def read_sheet(data, name):
+    # One sheet as a raw journal frame, with the columns read_csv would give
+    workbook = open_workbook(data)
+    try:
+        rows = workbook[name].iter_rows(values_only=True)
+        header = next(rows, ())
+        columns = [(i, str(value).strip()) for i, value in enumerate(header) if value is not None]
+        values = [row for row in rows if any(cell is not None for cell in row)]
+    finally:
+        workbook.close()
+    return pd.DataFrame({column: [row[i] if i < len(row) else None for row in values] for i, column in columns})
+
+
+# Workbook bytes of a worker process, received once when the worker starts rather than with every sheet
+_worker_data = None
+
+
+def _init_worker(data):
+    global _worker_data
+    _worker_data = data
+
+
+def _read_worker_sheet(name):
+    return read_sheet(_worker_data, name)
+
+
+def read_workbook(data, sheets=None, workers=1):
+    # Raw journal rows of every journal sheet. The app parses them in its own process: forking a pool from
+    # the threaded Streamlit server is unsafe. Batch callers can pass workers > 1 to parse several sheets
+    # in spawned worker processes.
+    sheets = sheets or journal_sheets(data)
+    if not sheets:
+        raise ValueError(f"No sheet with a {', '.join(JOURNAL_HEADER)} header")
+    if workers <= 1 or len(sheets) == 1:
+        frames = [read_sheet(data, name) for name in sheets]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sheets)),
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(data,)) as pool:
+            frames = list(pool.map(_read_worker_sheet, sheets))
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_workbook_ledger(data, sheets=None, workers=1):
+    df = read_workbook(data, sheets, workers)
+    # Text columns come back as mixed Python objects; give them the strings read_csv would produce
+    for col in df.columns:
+        if col not in JOURNAL_HEADER and df[col].dtype == object:
+            df[col] = df[col].map(lambda value: value if value is None else str(value))
+    return clean_ledger(df)